@@ -1,6 +1,16 @@
 import sqlite3
 from tkinter import messagebox
 
+# 修改窗口的预览查询，按单词查找时忽略大小写
+PREVIEW_BY_ID_SQL = "SELECT id, word, translation, example FROM words WHERE id = ?"
+PREVIEW_BY_WORD_SQL = "SELECT id, word, translation, example FROM words WHERE word = ? COLLATE NOCASE LIMIT 1"
+CURRENT_INFO_SQL = "SELECT word, translation, example FROM words WHERE id = ?"
+UPDATE_INFO_SQL = """
+    UPDATE words 
+    SET translation = ?, example = ?
+    WHERE id = ?
+"""
+
 def modify_word_info(conn, cursor, word_id, new_translation=None, new_example=None):
     """
     修改数据库中指定单词的翻译或例句。
@@ -15,7 +25,7 @@ def modify_word_info(conn, cursor, word_id, new_translation=None, new_example=No
     """
     try:
         # 检查单词 ID 是否存在
-        cursor.execute("SELECT word, translation, example FROM words WHERE id = ?", (word_id,))
+        cursor.execute(CURRENT_INFO_SQL, (word_id,))
         word_data = cursor.fetchone()
         if not word_data:
             print(f"ID {word_id} 对应的单词不存在！")
@@ -32,11 +42,7 @@ def modify_word_info(conn, cursor, word_id, new_translation=None, new_example=No
             return False
 
         # 更新数据库
-        cursor.execute("""
-            UPDATE words 
-            SET translation = ?, example = ?
-            WHERE id = ?
-        """, (translation, example, word_id))
+        cursor.execute(UPDATE_INFO_SQL, (translation, example, word_id))
         conn.commit()
 
         print(f"单词 '{word}' 已更新：")
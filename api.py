@@ -1,6 +1,9 @@
-from openai import OpenAI
+import json
 import os
+import threading
 from dotenv import load_dotenv
+from cache import normalize_word
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, SingleFlight
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
@@ -9,73 +12,193 @@ load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 base_url = os.getenv("OPENAI_BASE_URL")
 model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")  # 默认模型为 gpt-4o-mini
+batch_size = int(os.getenv("OPENAI_BATCH_SIZE", "20"))  # 每次请求打包的单词数量
 
-# 检查 API 密钥是否提供
-if not api_key:
-    raise ValueError("未提供 OpenAI API 密钥。请在 .env 文件中设置 OPENAI_API_KEY。")
+# OpenAI 客户端在第一次在线查询时才创建，导入本模块不会加载 openai 包
+_client = None
+_client_lock = threading.Lock()
 
-# 初始化 OpenAI 客户端，支持自定义 base_url
-client = OpenAI(api_key=api_key, base_url=base_url)
 
-def fetch_word_info(word):
+def get_client():
     """
-    使用 OpenAI API 查询单词信息，包括翻译、音标和例句。
-    返回包含翻译、音标和例句的字典，若失败则返回 None。
+    获取共享的 OpenAI 客户端，第一次调用时创建，支持自定义 base_url。
+
+    Raises:
+        ValueError: 未设置 OPENAI_API_KEY。
     """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if not api_key:
+                raise ValueError("未提供 OpenAI API 密钥。请在 .env 文件中设置 OPENAI_API_KEY。")
+            from openai import OpenAI
+            # 重试由 resilience.RetryPolicy 统一处理，关闭客户端自带的重试以免叠加
+            _client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return _client
+
+# 在线查询的容错：相同单词的并发请求只发送一次，暂时性错误指数退避重试，连续失败时熔断
+_flights = SingleFlight()
+_retry = RetryPolicy()
+_breaker = CircuitBreaker()
+
+
+def remote_paused():
+    """在线查询是否因熔断暂停；暂停期间查不到的单词不应计为一次失败。"""
+    return _breaker.is_open
+
+
+def remote_stats():
+    """返回在线查询的合并、重试和熔断计数。"""
+    return {"single_flight": _flights.stats(), "retry": _retry.stats(), "breaker": _breaker.stats()}
+
+# 批量查询的系统提示词，所有请求共用，单词列表单独放在用户消息中
+SYSTEM_PROMPT = """你是一个专业的英语助手，正在为生物单词记忆系统提供单词信息。
+用户会发送一个 JSON 字符串数组，每个元素是一个生物单词或术语。
+请只返回一个 JSON 数组，不要包含其他文字，数组中每个单词对应一个对象：
+{"word": 原单词, "translation": 简洁的中文翻译, "phonetic": 国际音标（例如 /ˈɛk.səm.pəl/）, "example": "简单的英文例句 | 例句中文翻译"}
+如果单词无效或无法查询，返回 {"word": 原单词, "error": "信息不可用"}。"""
+
+# 提示词版本，修改提示词或返回格式时需递增，使旧的缓存结果失效
+PROMPT_VERSION = "2"
+
+# 每个单词预留的输出 token 数
+TOKENS_PER_WORD = 120
+
+
+def _parse_items(content):
+    """从模型回复中提取 JSON 数组，兼容 Markdown 代码块包裹的情况。"""
+    start = content.find("[")
+    end = content.rfind("]")
+    if start == -1 or end <= start:
+        raise ValueError("返回内容中没有 JSON 数组")
+    items = json.loads(content[start:end + 1])
+    if not isinstance(items, list):
+        raise ValueError("返回内容不是 JSON 数组")
+    return items
+
+
+def _validate_item(item):
+    """
+    校验单个单词的返回结果。
+    返回单词信息字典；单词被判定为无效时返回 None；格式不完整时抛出 ValueError。
+    """
+    if item.get("error"):
+        return None
+    info = {key: item.get(key) for key in ("translation", "phonetic", "example")}
+    if not all(isinstance(value, str) and value.strip() for value in info.values()):
+        raise ValueError("返回内容不完整")
+    return {key: value.strip() for key, value in info.items()}
+
+
+def _request_batch(words):
+    """
+    发送一次批量查询请求。
+    返回 {单词: 单词信息或 None}，只包含通过校验的单词；未返回或格式错误的单词不在结果中。
+    """
+    response = get_client().chat.completions.create(
+        model=model,  # 从环境变量读取模型名称
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps(words, ensure_ascii=False)}
+        ],
+        max_tokens=TOKENS_PER_WORD * len(words),
+        temperature=0.5
+    )
     try:
-        # 构建提示词，请求模型提供单词的详细信息
-        prompt = f"""
-        我正在创建一个生物单词记忆系统，请提供以下关于生物单词 '{word}' 的信息：
-        1. 中文翻译（简洁明了）
-        2. 音标（国际音标格式，例如 /ˈɛk.səm.pəl/）
-        3. 一个简单的英文例句（包含该单词）及其中文翻译
-        用以下格式返回信息，确保内容准确且简洁：
-        翻译: [中文翻译]
-        音标: [音标]
-        例句: [英文例句] | [例句中文翻译]
-        如果单词无效或无法查询，请返回 '信息不可用'。
-        """
-
-        # 调用 OpenAI API
-        response = client.chat.completions.create(
-            model=model,  # 从环境变量读取模型名称
-            messages=[
-                {"role": "system", "content": "你是一个专业的英语助手，擅长提供单词的翻译和语言学习信息。"},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=150,
-            temperature=0.5
-        )
-
-        # 解析 API 响应内容
         content = response.choices[0].message.content.strip()
-        if "信息不可用" in content:
-            print(f"无法获取单词 '{word}' 的信息。")
-            return None
-
-        # 提取翻译、音标和例句
-        translation = ""
-        phonetic = ""
-        example = ""
-        for line in content.splitlines():
-            line = line.strip()
-            if line.startswith("翻译:"):
-                translation = line.replace("翻译:", "").strip()
-            elif line.startswith("音标:"):
-                phonetic = line.replace("音标:", "").strip()
-            elif line.startswith("例句:"):
-                example = line.replace("例句:", "").strip()
-
-        if translation and phonetic and example:
-            return {
-                'translation': translation,
-                'phonetic': phonetic,
-                'example': example
-            }
-        else:
-            print(f"解析单词 '{word}' 的信息时出错，返回内容不完整。")
-            return None
-
-    except Exception as e:
+    except (AttributeError, IndexError, TypeError) as e:
+        raise ValueError("返回内容为空") from e
+
+    # 按单词（忽略大小写和首尾空白）匹配返回结果
+    expected = {word.strip().lower(): word for word in words}
+    results = {}
+    for item in _parse_items(content):
+        if not isinstance(item, dict) or not isinstance(item.get("word"), str):
+            continue
+        word = expected.get(item["word"].strip().lower())
+        if word is None or word in results:
+            continue
+        try:
+            results[word] = _validate_item(item)
+        except ValueError:
+            continue
+    return results
+
+
+def _fetch_batch(words, results):
+    """
+    查询一批单词并写入 results。
+    暂时性错误先按 RetryPolicy 重试。收到回复但格式不符或部分单词结果不合格时，只把失败的单词
+    拆成两半分别重试，直到单个单词为止。请求本身失败（重试用尽、认证或配置错误）或熔断器打开时
+    不再拆分，这批单词不写入 results。
+
+    Raises:
+        ValueError: 未设置 OPENAI_API_KEY。
+    """
+    get_client()
+    from openai import OpenAIError
+    try:
+        batch_results = _retry.call(lambda: _breaker.call(lambda: _request_batch(words)))
+    except CircuitOpenError as e:
+        print(f"OpenAI API 查询跳过 {len(words)} 个单词: {e}")
+        return
+    except (OpenAIError, ConnectionError, TimeoutError) as e:
         print(f"OpenAI API 查询错误: {e}")
-        return None
+        return
+    except ValueError as e:
+        print(f"OpenAI API 返回内容无法解析: {e}")
+        batch_results = {}
+
+    results.update(batch_results)
+    failed = [word for word in words if word not in batch_results]
+    if not failed:
+        return
+    if len(words) == 1:
+        results[words[0]] = None
+        return
+    if len(failed) == 1:
+        _fetch_batch(failed, results)
+        return
+    mid = len(failed) // 2
+    _fetch_batch(failed[:mid], results)
+    _fetch_batch(failed[mid:], results)
+
+
+def _fetch_remote(words):
+    results = {}
+    for i in range(0, len(words), batch_size):
+        _fetch_batch(words[i:i + batch_size], results)
+    return results
+
+
+def fetch_remote(words):
+    """
+    使用 OpenAI API 批量查询单词信息，每次请求最多打包 OPENAI_BATCH_SIZE 个单词，不读写缓存。
+    其他线程正在查询的单词（忽略大小写）不重复请求，等待并共用其结果。
+    返回 {单词: 单词信息字典或 None}。
+    """
+    return _flights.do_many(words, _fetch_remote, key=normalize_word)
+
+
+def fetch_words_info(words):
+    """
+    批量查询多个单词的信息，依次查询本地词汇表、缓存和 OpenAI API（顺序由 LOOKUP_PROVIDERS 配置），
+    在线查询成功的结果写回缓存。
+    返回 {单词: 包含翻译、音标和例句的字典}，查询失败的单词对应 None。
+    """
+    from providers import get_chain
+
+    unique_words = list(dict.fromkeys(words))
+    results = get_chain().lookup_many(unique_words)
+    for word in unique_words:
+        if results.get(word) is None:
+            print(f"无法获取单词 '{word}' 的信息。")
+    return {word: results.get(word) for word in unique_words}
+
+
+def fetch_word_info(word):
+    """
+    查询单词信息，包括翻译、音标和例句。
+    返回包含翻译、音标和例句的字典，若失败则返回 None。
+    """
+    return fetch_words_info([word])[word]
@@ -0,0 +1,99 @@
+import tkinter as tk
+
+# 停止输入多少毫秒后才查询补全，连续按键只查询最后一次
+DEBOUNCE_MS = 150
+# 下拉列表最多显示的候选数
+SUGGESTION_LIMIT = 8
+
+
+class Autocomplete:
+    """
+    给 ttk.Entry 加上输入时的补全下拉列表。
+    complete(文本, 数量) 返回候选单词列表，在界面线程中调用，必须足够快（如 vocab_index.complete_word）。
+    按下方向键进入列表，回车或双击选中候选后填入输入框并调用 on_select(单词)，Esc 关闭列表。
+    """
+
+    def __init__(self, entry, complete, on_select=None, delay=DEBOUNCE_MS, limit=SUGGESTION_LIMIT):
+        self.entry = entry
+        self.complete = complete
+        self.on_select = on_select
+        self.delay = delay
+        self.limit = limit
+        self._pending = None
+        # 列表放在输入框所在的窗口中，紧贴输入框下方，覆盖在其他控件之上
+        self.listbox = tk.Listbox(entry.winfo_toplevel(), height=limit, activestyle="dotbox")
+
+        entry.bind("<KeyRelease>", self.on_key, add="+")
+        entry.bind("<Down>", self.focus_list, add="+")
+        entry.bind("<Escape>", lambda event: self.hide(), add="+")
+        entry.bind("<FocusOut>", self.on_focus_out, add="+")
+        entry.bind("<Destroy>", lambda event: self.cancel(), add="+")
+        self.listbox.bind("<Return>", self.choose)
+        self.listbox.bind("<Double-1>", self.choose)
+        self.listbox.bind("<Escape>", lambda event: self.hide(focus_entry=True))
+        self.listbox.bind("<FocusOut>", self.on_focus_out)
+
+    def on_key(self, event):
+        if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        self.cancel()
+        self._pending = self.entry.after(self.delay, self.refresh)
+
+    def cancel(self):
+        if self._pending is not None:
+            self.entry.after_cancel(self._pending)
+            self._pending = None
+
+    def refresh(self):
+        """按输入框当前内容更新候选列表；没有候选或唯一候选就是当前输入时隐藏列表。"""
+        self._pending = None
+        text = self.entry.get().strip()
+        matches = self.complete(text, self.limit) if text else []
+        if not matches or (len(matches) == 1 and matches[0].lower() == text.lower()):
+            self.hide()
+            return
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *matches)
+        self.listbox.config(height=len(matches))
+        self.listbox.place(in_=self.entry, relx=0, rely=1, relwidth=1)
+        self.listbox.lift()
+
+    def focus_list(self, event=None):
+        if self.listbox.winfo_ismapped():
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, tk.END)
+            self.listbox.selection_set(0)
+            self.listbox.activate(0)
+        return "break"
+
+    def choose(self, event=None):
+        selection = self.listbox.curselection()
+        if not selection:
+            return
+        word = self.listbox.get(selection[0])
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, word)
+        self.hide(focus_entry=True)
+        if self.on_select:
+            self.on_select(word)
+
+    def on_focus_out(self, event):
+        # 焦点在输入框和列表之间切换时保留列表，移到其他控件时隐藏
+        self.entry.after_idle(self._hide_if_unfocused)
+
+    def _hide_if_unfocused(self):
+        if not self.listbox.winfo_exists():
+            return
+        try:
+            focused = self.entry.focus_get()
+        except (KeyError, tk.TclError):
+            focused = None
+        if focused not in (self.entry, self.listbox):
+            self.hide()
+
+    def hide(self, focus_entry=False):
+        self.cancel()
+        self.listbox.place_forget()
+        if focus_entry:
+            self.entry.focus_set()
+            self.entry.icursor(tk.END)
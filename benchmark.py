@@ -0,0 +1,315 @@
+# 性能基准测试：生成 1k / 100k / 1M 单词的合成单词库，测量主要热点路径的耗时，
+# 并启动本地的 OpenAI 兼容 HTTP 服务，离线测试 api.fetch_word_info。结果写入 JSON 文件，便于多次运行之间比较。
+#
+# 命令行用法：
+#     python benchmark.py [--sizes 1000,100000,1000000] [--latency 0.2] [--error-rate 0.05]
+#                         [--import-latency 0] [--output benchmark.json]
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import string
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer:
+    """
+    本地 OpenAI 兼容服务，只实现 POST /v1/chat/completions。
+    用户消息为 JSON 单词数组时，按 api.SYSTEM_PROMPT 约定的格式返回每个单词的信息。
+    latency 为每个请求的固定延迟（秒），error_rate 为返回 HTTP 500 的概率，运行中可以修改。
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, payload = server.handle(self.path, body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def handle(self, path, body):
+        """处理一个请求，返回 (HTTP 状态码, JSON 响应)。"""
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"未知路径 {path}", "type": "invalid_request_error"}}
+        if failed:
+            return 500, {"error": {"message": "模拟的服务端错误", "type": "server_error"}}
+
+        request = json.loads(body)
+        try:
+            words = json.loads(request["messages"][-1]["content"])
+        except ValueError:
+            words = [request["messages"][-1]["content"]]
+        items = [
+            {
+                "word": word,
+                "translation": f"{word}的释义",
+                "phonetic": f"/{word}/",
+                "example": f"This is {word}. | 这是 {word}。",
+            }
+            for word in words
+        ]
+        return 200, {
+            "id": f"chatcmpl-bench-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(items, ensure_ascii=False)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def synthetic_words(size, seed):
+    """生成 size 个互不相同的随机小写单词（5 到 14 个字母）。"""
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 14))))
+    return sorted(words, key=lambda _: rng.random())
+
+
+def measure(func, runs=1):
+    """执行 func runs 次，返回耗时统计（毫秒）。"""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {
+        "runs": runs,
+        "total_ms": sum(durations),
+        "mean_ms": statistics.fmean(durations),
+        "p50_ms": durations[len(durations) // 2],
+        "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+        "max_ms": durations[-1],
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测函数的 print 输出，避免终端输出影响计时。"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_deck(size, server, import_latency, seed):
+    """在临时目录中生成 size 个单词的单词库并测量各热点路径，返回 {名称: 统计}。"""
+    from database import init_database, close_all_connections
+    from file_reader import read_txt_files
+    from recitation import REVIEW_QUEUE_SQL, REVIEW_ROWS_SQL, session_limit
+    from review_buffer import ReviewBuffer
+    from scheduler import sm2_update
+    from word_manager import query_word, view_mastery_level, fetch_words_page
+    from word_table import MASTERY_COLUMNS
+    from vocab_index import get_index, reset_index
+
+    results = {}
+    reset_index()
+    words = synthetic_words(size, seed)
+    rng = random.Random(seed)
+    with open("words.txt", "w", encoding="utf-8") as f:
+        f.write("\n".join(words) + "\n")
+
+    with quiet():
+        results["init_database_new"] = measure(init_database)
+        close_all_connections()
+        results["init_database_existing"] = measure(init_database, runs=5)
+        conn, cursor = init_database()
+
+        server.latency = import_latency
+        server.error_rate = 0.0
+        results["read_txt_files"] = measure(lambda: read_txt_files(conn, cursor))
+        results["read_txt_files"]["words"] = size
+        results["read_txt_files_unchanged"] = measure(lambda: read_txt_files(conn, cursor), runs=3)
+
+        results["vocab_index_build"] = measure(lambda: get_index(cursor))
+        sample = rng.sample(words, min(1000, size))
+        results["query_word_exact"] = measure(lambda: query_word(rng.choice(sample), conn, cursor), runs=1000)
+        typos = [word[:-1] + ("a" if word[-1] != "a" else "b") for word in sample]
+        results["query_word_fuzzy"] = measure(lambda: query_word(rng.choice(typos), conn, cursor), runs=200)
+
+        def review_queue():
+            cursor.execute(REVIEW_QUEUE_SQL, (time.time(), session_limit))
+            ids = [row[0] for row in cursor.fetchall()]
+            if ids:
+                cursor.execute(REVIEW_ROWS_SQL.format(", ".join("?" * len(ids))), ids)
+                cursor.fetchall()
+        results["recitation_queue"] = measure(review_queue, runs=100)
+
+        columns = [col[0] for col in MASTERY_COLUMNS]
+        results["mastery_page"] = measure(
+            lambda: fetch_words_page(cursor, columns, "easiness_factor", True, None, 26), runs=100
+        )
+        results["view_mastery_level"] = measure(lambda: view_mastery_level(cursor))
+
+        ids = [row[0] for row in cursor.execute("SELECT id FROM words LIMIT 10000")]
+        buffer = ReviewBuffer(conn, path=os.path.abspath("review_journal.jsonl"))
+
+        def sm2_updates():
+            for word_id in ids:
+                quality = rng.choice((2, 4))
+                interval, repetitions, easiness_factor, status = sm2_update(quality, 0, 0, 2.5)
+                buffer.add(word_id, status, interval, repetitions, easiness_factor,
+                           time.time() + interval * 86400, quality, (0, 0, 2.5), latency_ms=1000)
+            buffer.flush()
+        results["sm2_updates"] = measure(sm2_updates)
+        results["sm2_updates"]["updates"] = len(ids)
+        buffer.close()
+        close_all_connections()
+    return results
+
+
+def bench_api(server, latency, error_rate, seed, words=200):
+    """用本地服务测试 api.fetch_word_info（逐个查询）和 api.fetch_words_info（批量查询）。"""
+    import api
+
+    server.latency = latency
+    server.error_rate = error_rate
+    fresh = iter(synthetic_words(words * 2, seed))
+    requests_before = server.requests
+    with quiet():
+        single = measure(lambda: api.fetch_word_info(next(fresh)), runs=max(1, words // 10))
+        batch_words = [next(fresh) for _ in range(words)]
+        batch = measure(lambda: api.fetch_words_info(batch_words))
+    batch["words"] = words
+    return {
+        "fetch_word_info": single,
+        "fetch_words_info": batch,
+        "server": {"requests": server.requests - requests_before, "latency_s": latency, "error_rate": error_rate},
+        "resilience": api.remote_stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单词记忆系统性能基准测试")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="单词库大小，逗号分隔")
+    parser.add_argument("--latency", type=float, default=0.2, help="测试 API 时本地服务的请求延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="测试 API 时本地服务返回 500 的概率")
+    parser.add_argument("--import-latency", type=float, default=0.0, help="导入单词本时本地服务的请求延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    output = os.path.abspath(args.output)
+
+    with FakeOpenAIServer(seed=args.seed) as server, tempfile.TemporaryDirectory() as workdir:
+        # 应用模块在导入时读取环境变量（load_dotenv 不覆盖已设置的变量），必须在导入前把数据库、缓存、
+        # 词汇表、复习日志和 API 全部指向临时目录和本地服务，避免 .env 中的设置让测试写入真实的单词库
+        os.environ.update({
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": server.base_url,
+            "CACHE_PATH": os.path.join(workdir, "word_cache.db"),
+            "CACHE_MAX_ENTRIES": str(max(sizes) * 2),
+            "ENRICH_RATE_LIMIT": os.environ.get("BENCH_ENRICH_RATE_LIMIT", "0"),
+            # 临时目录中没有词汇表，查询链中的词汇表为空，未缓存的单词都会请求本地服务
+            "GLOSSARY_SOURCE": os.path.join(workdir, "glossary.tsv"),
+            "GLOSSARY_PATH": os.path.join(workdir, "glossary.bin"),
+            "LOOKUP_PROVIDERS": "glossary,cache,openai",
+            "DB_PATH": os.path.join(workdir, "word_database.db"),
+            "REVIEW_JOURNAL_PATH": os.path.join(workdir, "review_journal.jsonl"),
+        })
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+        report = {
+            "meta": {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "args": vars(args),
+            },
+            "decks": {},
+        }
+        cwd = os.getcwd()
+        try:
+            for size in sizes:
+                deck_dir = os.path.join(workdir, f"deck_{size}")
+                os.makedirs(deck_dir)
+                os.chdir(deck_dir)
+                # 数据库路径在每次建立连接时读取，每个单词库使用自己目录中的数据库（复习日志路径由 bench_deck 直接传入）
+                os.environ["DB_PATH"] = os.path.join(deck_dir, "word_database.db")
+                print(f"测试 {size} 个单词的单词库...")
+                report["decks"][str(size)] = bench_deck(size, server, args.import_latency, args.seed + size)
+            os.chdir(workdir)
+            print("测试在线查询...")
+            report["api"] = bench_api(server, args.latency, args.error_rate, args.seed)
+        finally:
+            os.chdir(cwd)
+        report["meta"]["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    for size, results in report["decks"].items():
+        for name, stats in results.items():
+            print(f"{size:>8} {name:<28} 平均 {stats['mean_ms']:10.3f} 毫秒  p95 {stats['p95_ms']:10.3f} 毫秒")
+    for name in ("fetch_word_info", "fetch_words_info"):
+        stats = report["api"][name]
+        print(f"{'api':>8} {name:<28} 平均 {stats['mean_ms']:10.3f} 毫秒  p95 {stats['p95_ms']:10.3f} 毫秒")
+    print(f"{'api':>8} {'resilience':<28} {json.dumps(report['api']['resilience'], ensure_ascii=False)}")
+    print(f"结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import sqlite3
+import os
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 缓存配置，从环境变量读取
+cache_path = os.getenv("CACHE_PATH", "word_cache.db")
+cache_ttl_days = float(os.getenv("CACHE_TTL_DAYS", "180"))  # 缓存有效期（天），<= 0 表示永不过期
+cache_max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "200000"))  # 最大缓存条目数，超出后按 LRU 淘汰
+
+CREATE_CACHE_SQL = """
+    CREATE TABLE IF NOT EXISTS lookup_cache (
+        model TEXT NOT NULL,
+        word_key TEXT NOT NULL,
+        prompt_version TEXT NOT NULL,
+        translation TEXT NOT NULL,
+        phonetic TEXT NOT NULL,
+        example TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        PRIMARY KEY (model, word_key, prompt_version)
+    )
+"""
+CREATE_CACHE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_lookup_cache_accessed ON lookup_cache (accessed_at)"
+COUNT_SQL = "SELECT COUNT(*) FROM lookup_cache"
+GET_SQL = """
+    SELECT translation, phonetic, example, created_at FROM lookup_cache
+    WHERE model = ? AND word_key = ? AND prompt_version = ?
+"""
+EXISTS_SQL = "SELECT 1 FROM lookup_cache WHERE model = ? AND word_key = ? AND prompt_version = ?"
+TOUCH_SQL = """
+    UPDATE lookup_cache SET accessed_at = ?
+    WHERE model = ? AND word_key = ? AND prompt_version = ?
+"""
+PUT_SQL = """
+    INSERT OR REPLACE INTO lookup_cache
+    (model, word_key, prompt_version, translation, phonetic, example, created_at, accessed_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+EXPIRE_SQL = "DELETE FROM lookup_cache WHERE created_at < ?"
+# 按最近访问时间淘汰最旧的条目，使用 idx_lookup_cache_accessed
+EVICT_SQL = """
+    DELETE FROM lookup_cache WHERE rowid IN (
+        SELECT rowid FROM lookup_cache ORDER BY accessed_at LIMIT ?
+    )
+"""
+# 预热缓存时读取 words 表中信息完整的单词（在主数据库上执行）
+PREWARM_SQL = """
+    SELECT word, translation, phonetic, example FROM words
+    WHERE translation IS NOT NULL AND phonetic IS NOT NULL AND example IS NOT NULL
+"""
+
+
+def normalize_word(word):
+    """规范化单词作为缓存键：去除首尾空白、合并连续空白并转为小写。"""
+    return " ".join(word.split()).lower()
+
+
+class LookupCache:
+    """
+    基于独立 SQLite 文件的单词查询结果缓存。
+    缓存键为 (模型, 规范化单词, 提示词版本)，支持 TTL 过期和按最近访问时间的 LRU 淘汰。
+    同一实例可被多个线程共享。
+    """
+
+    def __init__(self, path=None, ttl_days=None, max_entries=None):
+        self.path = path or cache_path
+        self.ttl = (cache_ttl_days if ttl_days is None else ttl_days) * 86400
+        self.max_entries = cache_max_entries if max_entries is None else max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(CREATE_CACHE_SQL)
+        self._conn.execute(CREATE_CACHE_INDEX_SQL)
+        self._conn.commit()
+        self._size = self._conn.execute(COUNT_SQL).fetchone()[0]
+
+    def get_many(self, model, prompt_version, words):
+        """
+        批量读取缓存。
+        返回 {单词: 单词信息字典}，只包含命中且未过期的单词。
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            for word in words:
+                row = self._conn.execute(GET_SQL, (model, normalize_word(word), prompt_version)).fetchone()
+                if row and (self.ttl <= 0 or now - row[3] < self.ttl):
+                    found[word] = {'translation': row[0], 'phonetic': row[1], 'example': row[2]}
+            self._conn.executemany(TOUCH_SQL, [(now, model, normalize_word(word), prompt_version) for word in found])
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(words) - len(found)
+        return found
+
+    def put_many(self, model, prompt_version, items):
+        """
+        批量写入缓存，items 为 {单词: 单词信息字典}，值为空的单词不写入。
+        写入后若条目数超过上限，按最近访问时间淘汰最旧的条目。
+        """
+        now = time.time()
+        # 规范化后相同的单词只写入最后一条
+        rows = {
+            (model, normalize_word(word), prompt_version):
+            (model, normalize_word(word), prompt_version,
+             info['translation'], info['phonetic'], info['example'], now, now)
+            for word, info in items.items() if info
+        }
+        if not rows:
+            return
+        with self._lock:
+            # INSERT OR REPLACE 覆盖已有条目时条目数不变，只计入新增的键
+            added = sum(1 for key in rows if self._conn.execute(EXISTS_SQL, key).fetchone() is None)
+            self._conn.executemany(PUT_SQL, rows.values())
+            self._size += added
+            if self.max_entries > 0 and self._size > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """删除过期条目，并把条目数淘汰到上限的 90%。调用方需持有锁。"""
+        if self.ttl > 0:
+            self._conn.execute(EXPIRE_SQL, (time.time() - self.ttl,))
+        self._size = self._conn.execute(COUNT_SQL).fetchone()[0]
+        excess = self._size - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(EVICT_SQL, (excess,))
+            self.evictions += excess
+            self._size -= excess
+
+    def prewarm(self, cursor, model, prompt_version):
+        """
+        用现有 words 表中信息完整的单词预热缓存，数据库重建或在其他机器导入时无需再次联网查询。
+        返回写入缓存的单词数量。
+        """
+        cursor.execute(PREWARM_SQL)
+        count = 0
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            self.put_many(model, prompt_version, {
+                word: {'translation': translation, 'phonetic': phonetic, 'example': example}
+                for word, translation, phonetic, example in rows
+            })
+            count += len(rows)
+        return count
+
+    def stats(self):
+        """返回缓存统计信息：条目数、命中数、未命中数、命中率和淘汰数。"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """获取进程内共享的缓存实例，首次调用时打开缓存文件。"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LookupCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    # 命令行用法：python cache.py prewarm  用当前单词库预热缓存
+    #            python cache.py stats    查看缓存统计
+    if len(sys.argv) > 1 and sys.argv[1] == "prewarm":
+        from database import init_database, close_database
+        from api import model, PROMPT_VERSION
+        conn, cursor = init_database()
+        print(f"已预热 {get_cache().prewarm(cursor, model, PROMPT_VERSION)} 个单词。")
+        close_database(conn)
+    else:
+        print(get_cache().stats())
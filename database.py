@@ -1,50 +1,78 @@
 import sqlite3
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # 加载 .env 文件中的环境变量
 load_dotenv()
 
-def init_database():
+# 数据库连接配置，从环境变量读取
+busy_timeout_ms = int(os.getenv("DB_BUSY_TIMEOUT_MS", "10000"))  # 数据库被占用时的最长等待时间（毫秒）
+synchronous = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()  # 同步模式：OFF / NORMAL / FULL / EXTRA
+cache_size_kib = int(os.getenv("DB_CACHE_SIZE_KIB", "32768"))  # 每个连接的页缓存大小（KiB）
+statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE", "256"))  # 每个连接缓存的预编译语句数量
+
+# 每个线程独享一个连接，所有连接登记在 _connections 中以便退出时统一关闭
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+def connect():
     """
-    初始化数据库，创建 words 表（如果不存在），并确保表结构正确。
-    返回数据库连接和游标对象。
+    打开一个新的数据库连接并设置连接参数：WAL 日志模式（读写互不阻塞）、busy_timeout、
+    同步模式、页缓存大小以及预编译语句缓存。
+    连接允许在创建它的线程之外关闭，但同一时间只应由一个线程使用。
     """
-    db_path = os.getenv("DB_PATH", "word_database.db")
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # 检查当前表结构
-        cursor.execute("PRAGMA table_info(words)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        # 如果存在 next_review_date 列，迁移到新表
-        if 'next_review_date' in columns:
-            cursor.execute('''
-                CREATE TABLE words_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    word TEXT UNIQUE NOT NULL,
-                    translation TEXT,
-                    phonetic TEXT,
-                    example TEXT,
-                    status TEXT DEFAULT '未学习',
-                    interval INTEGER DEFAULT 0,
-                    repetitions INTEGER DEFAULT 0,
-                    easiness_factor REAL DEFAULT 2.5
-                )
-            ''')
-            cursor.execute('''
-                INSERT INTO words_new (id, word, translation, phonetic, example, status, interval, repetitions, easiness_factor)
-                SELECT id, word, translation, phonetic, example, status, interval, repetitions, easiness_factor FROM words
-            ''')
-            cursor.execute("DROP TABLE words")
-            cursor.execute("ALTER TABLE words_new RENAME TO words")
-            print("已移除 next_review_date 列并迁移数据")
-        
-        # 创建 words 表（如果不存在）
+    if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise ValueError(f"无效的 DB_SYNCHRONOUS 设置: {synchronous}")
+    conn = sqlite3.connect(
+        os.getenv("DB_PATH", "word_database.db"),
+        timeout=busy_timeout_ms / 1000,
+        cached_statements=statement_cache_size,
+        check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+    conn.execute(f"PRAGMA synchronous = {synchronous}")
+    conn.execute(f"PRAGMA cache_size = {-cache_size_kib}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def get_connection():
+    """
+    获取当前线程专用的数据库连接，首次调用时创建。
+    界面、导入任务和背诵模式各自使用自己线程的连接，可以同时读写。
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = connect()
+        _local.conn = conn
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+def close_all_connections():
+    """关闭所有线程的数据库连接，在程序退出时调用。"""
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _connections.clear()
+    _local.__dict__.pop("conn", None)
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [col[1] for col in cursor.fetchall()]
+
+def _migrate_base_schema(cursor):
+    """创建 words 表；旧版数据库移除 next_review_date 列，并统一旧的单词状态。"""
+    # 如果存在 next_review_date 列，迁移到新表
+    if 'next_review_date' in _table_columns(cursor, 'words'):
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS words (
+            CREATE TABLE words_new (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 word TEXT UNIQUE NOT NULL,
                 translation TEXT,
@@ -56,11 +84,357 @@ def init_database():
                 easiness_factor REAL DEFAULT 2.5
             )
         ''')
+        cursor.execute('''
+            INSERT INTO words_new (id, word, translation, phonetic, example, status, interval, repetitions, easiness_factor)
+            SELECT id, word, translation, phonetic, example, status, interval, repetitions, easiness_factor FROM words
+        ''')
+        cursor.execute("DROP TABLE words")
+        cursor.execute("ALTER TABLE words_new RENAME TO words")
+        print("已移除 next_review_date 列并迁移数据")
+
+    # 创建 words 表（如果不存在）
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS words (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT UNIQUE NOT NULL,
+            translation TEXT,
+            phonetic TEXT,
+            example TEXT,
+            status TEXT DEFAULT '未学习',
+            interval INTEGER DEFAULT 0,
+            repetitions INTEGER DEFAULT 0,
+            easiness_factor REAL DEFAULT 2.5
+        )
+    ''')
+
+    # 更新旧数据状态
+    cursor.execute("UPDATE words SET status = '未学习' WHERE status IS NULL OR status = '需复习'")
+
+def _migrate_due_at(cursor):
+    """添加到期时间列（Unix 时间戳），由背诵模式根据 SM2 间隔维护，0 表示立即到期。"""
+    if 'due_at' not in _table_columns(cursor, 'words'):
+        cursor.execute("ALTER TABLE words ADD COLUMN due_at REAL DEFAULT 0")
+    # 复习队列按到期时间查询未掌握的单词
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_due ON words (due_at) WHERE status != '已掌握'")
+
+def _migrate_sort_indexes(cursor):
+    """单词列表分页视图的排序列索引。"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_status ON words (status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_repetitions ON words (repetitions)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_easiness ON words (easiness_factor)")
+
+def _migrate_import_manifest(cursor):
+    """创建导入清单表，记录每个单词本文件已处理到的位置，用于增量导入。"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_manifest (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            processed_offset INTEGER NOT NULL,
+            processed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+# 由程序管理的 words 表二级索引：名称 -> 建索引语句
+INDEXES = {
+    # 复习队列：未掌握单词按到期时间排序，包含队列查询用到的全部列（覆盖索引）
+    "idx_words_review_queue":
+        "CREATE INDEX IF NOT EXISTS idx_words_review_queue ON words (due_at, status, easiness_factor, repetitions) "
+        "WHERE status != '已掌握'",
+    # 按状态统计和排序
+    "idx_words_status": "CREATE INDEX IF NOT EXISTS idx_words_status ON words (status)",
+    # 单词列表按复习次数、易度因子排序
+    "idx_words_repetitions": "CREATE INDEX IF NOT EXISTS idx_words_repetitions ON words (repetitions)",
+    "idx_words_easiness": "CREATE INDEX IF NOT EXISTS idx_words_easiness ON words (easiness_factor)",
+    # 忽略大小写的单词查找
+    "idx_words_word_nocase": "CREATE INDEX IF NOT EXISTS idx_words_word_nocase ON words (word COLLATE NOCASE)",
+}
+
+# 已被 INDEXES 取代、需要删除的旧索引
+OBSOLETE_INDEXES = ["idx_words_due"]
+
+def _migrate_managed_indexes(cursor):
+    """按 INDEXES 创建二级索引，并删除已废弃的索引。"""
+    for name in OBSOLETE_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+    for ddl in INDEXES.values():
+        cursor.execute(ddl)
+
+def _migrate_review_log(cursor):
+    """
+    创建只追加的复习日志 reviews 和按天汇总表 review_daily。
+    每插入一条复习记录，触发器在同一事务中更新当天的汇总，统计时无需扫描完整日志。
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reviews (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word_id INTEGER NOT NULL,
+            reviewed_at REAL NOT NULL,
+            quality INTEGER NOT NULL,
+            latency_ms INTEGER,
+            prev_interval INTEGER,
+            prev_repetitions INTEGER,
+            prev_easiness_factor REAL,
+            new_interval INTEGER,
+            new_repetitions INTEGER,
+            new_easiness_factor REAL,
+            new_status TEXT,
+            UNIQUE (word_id, reviewed_at)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS review_daily (
+            day TEXT PRIMARY KEY,
+            reviews INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            lapses INTEGER NOT NULL DEFAULT 0,
+            quality_sum INTEGER NOT NULL DEFAULT 0,
+            latency_ms_sum INTEGER NOT NULL DEFAULT 0,
+            mastered INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # 按本地日期汇总：答对（quality >= 3）、遗忘（已复习过又答错）、本次变为已掌握
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_reviews_daily AFTER INSERT ON reviews
+        BEGIN
+            INSERT INTO review_daily (day, reviews, correct, lapses, quality_sum, latency_ms_sum, mastered)
+            VALUES (
+                date(NEW.reviewed_at, 'unixepoch', 'localtime'), 1,
+                NEW.quality >= 3,
+                NEW.quality < 3 AND NEW.prev_repetitions > 0,
+                NEW.quality,
+                COALESCE(NEW.latency_ms, 0),
+                NEW.new_status = '已掌握'
+            )
+            ON CONFLICT (day) DO UPDATE SET
+                reviews = reviews + excluded.reviews,
+                correct = correct + excluded.correct,
+                lapses = lapses + excluded.lapses,
+                quality_sum = quality_sum + excluded.quality_sum,
+                latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum,
+                mastered = mastered + excluded.mastered;
+        END
+    """)
+
+def _migrate_scheduler_params(cursor):
+    """创建按单词库保存的 SM2 拟合参数表，params 为 JSON。"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scheduler_params (
+            deck TEXT PRIMARY KEY,
+            params TEXT NOT NULL,
+            target_retention REAL,
+            predicted_retention REAL,
+            predicted_load REAL,
+            reviews_used INTEGER,
+            fitted_at REAL
+        )
+    """)
+
+HAS_FTS_SQL = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'words_fts'"
 
-        # 更新旧数据状态
-        cursor.execute("UPDATE words SET status = '未学习' WHERE status IS NULL OR status = '需复习'")
-        
+def _migrate_fulltext_search(cursor):
+    """
+    创建 words 表的 FTS5 外部内容全文索引 words_fts（trigram 分词，支持中文子串），
+    由触发器与 words 表的 word、translation、example 列保持同步，并为已有单词建立索引。
+    SQLite 未编译 FTS5 时跳过，search.py 退化为 LIKE 查询，之后每次启动由 ensure_fulltext_search 重试。
+    """
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+                word, translation, example,
+                content='words', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"SQLite 不支持 FTS5 trigram 分词，跳过全文索引: {e}")
+        return
+    # 排序权重：单词 > 翻译 > 例句
+    cursor.execute("INSERT INTO words_fts (words_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_words_fts_insert AFTER INSERT ON words
+        BEGIN
+            INSERT INTO words_fts (rowid, word, translation, example)
+            VALUES (NEW.id, NEW.word, NEW.translation, NEW.example);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_words_fts_delete AFTER DELETE ON words
+        BEGIN
+            INSERT INTO words_fts (words_fts, rowid, word, translation, example)
+            VALUES ('delete', OLD.id, OLD.word, OLD.translation, OLD.example);
+        END
+    """)
+    # 只在文本列变化时更新索引，复习时更新 SM2 参数不触发
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_words_fts_update AFTER UPDATE OF word, translation, example ON words
+        BEGIN
+            INSERT INTO words_fts (words_fts, rowid, word, translation, example)
+            VALUES ('delete', OLD.id, OLD.word, OLD.translation, OLD.example);
+            INSERT INTO words_fts (rowid, word, translation, example)
+            VALUES (NEW.id, NEW.word, NEW.translation, NEW.example);
+        END
+    """)
+    cursor.execute("INSERT INTO words_fts (words_fts) VALUES ('rebuild')")
+
+def _migrate_enrichment_queue(cursor):
+    """
+    创建单词信息补查队列 enrichment_queue：导入时查询失败的单词在这里等待后台重试，
+    记录尝试次数、下次尝试时间和最近的错误。已有的缺少翻译的单词也加入队列。
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enrichment_queue (
+            word_id INTEGER PRIMARY KEY,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            enqueued_at REAL NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_enrichment_queue_next ON enrichment_queue (next_attempt_at)")
+    now = time.time()
+    cursor.execute("""
+        INSERT OR IGNORE INTO enrichment_queue (word_id, next_attempt_at, last_error, enqueued_at)
+        SELECT id, ?, '升级前缺少单词信息', ? FROM words WHERE translation IS NULL
+    """, (now, now))
+
+# 建立单字/双字索引的最大文本长度（字符），超出部分的汉字不进入 words_grams
+GRAM_MAX_CHARS = 1000
+# 从 (id, text) 来源中取出所有单个汉字和相邻两个汉字（CJK 统一汉字及扩展 A 区）
+GRAM_SELECT_SQL = """
+    SELECT substr(t.text, p.n, g.len), t.id
+    FROM ({source}) t
+    JOIN text_positions p ON p.n <= length(t.text)
+    JOIN (SELECT 1 AS len UNION ALL SELECT 2) g
+    WHERE unicode(substr(t.text, p.n, 1)) BETWEEN 13312 AND 40959
+      AND (g.len = 1 OR unicode(substr(t.text, p.n + 1, 1)) BETWEEN 13312 AND 40959)
+"""
+
+def _migrate_cjk_grams(cursor):
+    """
+    创建 words_grams：翻译和例句中每个汉字及相邻两个汉字到单词 ID 的索引。
+    trigram 全文索引无法匹配一两个字的中文词（如“蛋白”“细胞”），search.py 用它代替全表 LIKE 扫描。
+    由触发器保持同步；触发器中不能使用 WITH，用 text_positions 数字表逐个位置取字。
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS text_positions (n INTEGER PRIMARY KEY)")
+    cursor.execute("""
+        INSERT OR IGNORE INTO text_positions (n)
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+        SELECT n FROM seq
+    """, (GRAM_MAX_CHARS,))
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS words_grams (
+            gram TEXT NOT NULL,
+            word_id INTEGER NOT NULL,
+            PRIMARY KEY (gram, word_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_words_grams_word ON words_grams (word_id)")
+    new_source = "SELECT NEW.id AS id, NEW.translation AS text UNION ALL SELECT NEW.id, NEW.example"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_words_grams_insert AFTER INSERT ON words
+        BEGIN
+            INSERT OR IGNORE INTO words_grams (gram, word_id) {GRAM_SELECT_SQL.format(source=new_source)};
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_words_grams_delete AFTER DELETE ON words
+        BEGIN
+            DELETE FROM words_grams WHERE word_id = OLD.id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_words_grams_update AFTER UPDATE OF translation, example ON words
+        BEGIN
+            DELETE FROM words_grams WHERE word_id = OLD.id;
+            INSERT OR IGNORE INTO words_grams (gram, word_id) {GRAM_SELECT_SQL.format(source=new_source)};
+        END
+    """)
+    all_source = "SELECT id, translation AS text FROM words UNION ALL SELECT id, example FROM words"
+    cursor.execute("DELETE FROM words_grams")
+    cursor.execute(f"INSERT OR IGNORE INTO words_grams (gram, word_id) {GRAM_SELECT_SQL.format(source=all_source)}")
+
+# 按顺序执行的数据库迁移：(版本号, 说明, 迁移函数)。
+# 数据库当前版本保存在 PRAGMA user_version 中，只执行版本号更高的迁移；
+# 每个迁移都必须可重复执行，新迁移只能追加到末尾。
+MIGRATIONS = [
+    (1, "创建 words 表", _migrate_base_schema),
+    (2, "添加到期时间列", _migrate_due_at),
+    (3, "添加排序索引", _migrate_sort_indexes),
+    (4, "创建导入清单表", _migrate_import_manifest),
+    (5, "更新二级索引", _migrate_managed_indexes),
+    (6, "创建复习日志和每日汇总表", _migrate_review_log),
+    (7, "创建调度参数表", _migrate_scheduler_params),
+    (8, "创建全文索引", _migrate_fulltext_search),
+    (9, "创建单词信息补查队列", _migrate_enrichment_queue),
+    (10, "创建汉字索引", _migrate_cjk_grams),
+]
+
+def migrate(conn):
+    """
+    执行尚未应用的迁移，每个迁移在独立事务中完成并更新 user_version。
+    返回 (迁移前版本, 迁移后版本)。
+    """
+    cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    start_version = version
+    for target, description, func in MIGRATIONS:
+        if target <= version:
+            continue
+        cursor.execute("BEGIN")
+        try:
+            func(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"已应用数据库迁移 v{target}: {description}")
+        version = target
+    return start_version, version
+
+def ensure_fulltext_search(conn):
+    """
+    迁移 v8 在 SQLite 不支持 FTS5 trigram 时不建全文索引，但版本号仍会更新；
+    这里检查 words_fts 是否存在，缺失时重新创建（例如升级 SQLite 之后）。返回是否新建了索引。
+    """
+    cursor = conn.cursor()
+    if cursor.execute(HAS_FTS_SQL).fetchone():
+        return False
+    cursor.execute("BEGIN")
+    try:
+        _migrate_fulltext_search(cursor)
         conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    created = cursor.execute(HAS_FTS_SQL).fetchone() is not None
+    if created:
+        print("已创建全文索引")
+    return created
+
+def init_database():
+    """
+    初始化数据库：执行尚未应用的结构迁移，结构已是最新时只读取一次 user_version。
+    返回数据库连接和游标对象。
+    """
+    db_path = os.getenv("DB_PATH", "word_database.db")
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        start = time.perf_counter()
+        old_version, new_version = migrate(conn)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if new_version != old_version:
+            print(f"数据库结构已从 v{old_version} 升级到 v{new_version}，耗时 {elapsed_ms:.1f} 毫秒")
+        else:
+            print(f"数据库结构为最新版本 v{new_version}，检查耗时 {elapsed_ms:.1f} 毫秒")
+        if new_version >= 8:
+            ensure_fulltext_search(conn)
+        if new_version > MIGRATIONS[-1][0]:
+            print(f"警告：数据库版本 v{new_version} 高于程序支持的版本 v{MIGRATIONS[-1][0]}")
+
         print(f"数据库初始化成功，路径: {db_path}")
         return conn, cursor
     except Exception as e:
@@ -70,4 +444,9 @@ def close_database(conn):
     """
     关闭数据库连接。
     """
+    with _connections_lock:
+        if conn in _connections:
+            _connections.remove(conn)
+    if getattr(_local, "conn", None) is conn:
+        del _local.conn
     conn.close()
\ No newline at end of file
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 并发查询配置，从环境变量读取
+max_workers = int(os.getenv("ENRICH_MAX_WORKERS", "8"))  # 最大并发线程数
+rate_limit = float(os.getenv("ENRICH_RATE_LIMIT", "5"))  # 每秒允许的请求数，<= 0 表示不限流
+burst = int(os.getenv("ENRICH_BURST", "0")) or None  # 令牌桶容量，默认等于每秒请求数
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器。
+    令牌按 rate 个/秒的速度补充，最多累积 capacity 个；每次请求前消耗一个令牌，
+    令牌不足时阻塞等待。rate <= 0 时不做限流。
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """获取指定数量的令牌，必要时阻塞等待。"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class EnrichmentReport:
+    """
+    一次批量查询的结果汇总。
+    results: {单词: 单词信息字典或 None}，按输入顺序保存每个单词的结果。
+    failed: 查询失败的单词列表。
+    elapsed: 总耗时（秒）。
+    """
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+        self.failed = [word for word, info in results.items() if not info]
+
+    @property
+    def succeeded(self):
+        return len(self.results) - len(self.failed)
+
+    @property
+    def throughput(self):
+        """吞吐量（单词/秒）。"""
+        return len(self.results) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return (
+            f"查询 {len(self.results)} 个单词，成功 {self.succeeded} 个，失败 {len(self.failed)} 个，"
+            f"耗时 {self.elapsed:.2f} 秒，吞吐量 {self.throughput:.2f} 单词/秒。"
+        )
+
+
+def enrich_words(words, fetch_many=None, batch_size=None, workers=None, rate=None, capacity=None, job=None):
+    """
+    使用有界线程池并发查询单词信息，并通过令牌桶限制请求速率。
+    单词按 batch_size 分批，每批作为一个任务调用 fetch_many，每个任务消耗一个令牌。
+
+    Args:
+        words (list[str]): 要查询的单词列表（重复单词只查询一次）。
+        fetch_many (callable, optional): 批量查询函数，接收单词列表并返回 {单词: 单词信息或 None}，
+            默认使用 api.fetch_words_info。
+        batch_size (int, optional): 每个任务包含的单词数，默认读取 OPENAI_BATCH_SIZE。
+        workers (int, optional): 并发线程数，默认读取 ENRICH_MAX_WORKERS。
+        rate (float, optional): 每秒请求数上限，默认读取 ENRICH_RATE_LIMIT。
+        capacity (int, optional): 令牌桶容量，默认读取 ENRICH_BURST。
+        job (jobs.Job, optional): 后台任务句柄，用于汇报进度和响应取消。
+
+    Returns:
+        EnrichmentReport: 每个单词的查询结果及吞吐量统计。
+    """
+    if fetch_many is None:
+        from api import fetch_words_info
+        fetch_many = fetch_words_info
+    if batch_size is None:
+        batch_size = int(os.getenv("OPENAI_BATCH_SIZE", "20"))
+    unique_words = list(dict.fromkeys(words))
+    results = dict.fromkeys(unique_words)
+    start = time.perf_counter()
+    if not unique_words:
+        return EnrichmentReport(results, 0.0)
+
+    batches = [unique_words[i:i + batch_size] for i in range(0, len(unique_words), batch_size)]
+    bucket = TokenBucket(rate_limit if rate is None else rate, capacity or burst)
+
+    def task(batch):
+        bucket.acquire()
+        if job and job.cancelled:
+            return {}
+        return fetch_many(batch)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=min(workers or max_workers, len(batches))) as executor:
+        futures = {executor.submit(task, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            batch = futures[future]
+            done += len(batch)
+            try:
+                batch_results = future.result()
+            except Exception as e:
+                print(f"批量查询 {len(batch)} 个单词时出错: {e}")
+            else:
+                for word in batch:
+                    results[word] = batch_results.get(word)
+            # 出错的批次也计入进度，否则进度条停在总数之前
+            if job:
+                job.report_progress(done, len(unique_words), "查询单词信息")
+                if job.cancelled:
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+    return EnrichmentReport(results, time.perf_counter() - start)
@@ -0,0 +1,208 @@
+import os
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+from enrichment import TokenBucket
+from resilience import CircuitOpenError, breaker_reset_seconds
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 补查队列配置，从环境变量读取
+queue_batch_size = int(os.getenv("ENRICH_QUEUE_BATCH", "20"))  # 每批补查的单词数
+queue_rate = float(os.getenv("ENRICH_QUEUE_RATE", "0.2"))  # 每秒最多补查的批数，<= 0 表示不限流
+queue_poll_seconds = float(os.getenv("ENRICH_QUEUE_POLL_SECONDS", "60"))  # 队列中没有到期单词时的检查间隔（秒）
+queue_retry_seconds = float(os.getenv("ENRICH_QUEUE_RETRY_SECONDS", "300"))  # 第一次重试前的等待（秒），之后每次翻倍
+queue_max_delay = float(os.getenv("ENRICH_QUEUE_MAX_DELAY", "86400"))  # 两次重试之间的最长等待（秒）
+queue_max_attempts = int(os.getenv("ENRICH_QUEUE_MAX_ATTEMPTS", "12"))  # 超过后不再自动重试
+
+ENQUEUE_SQL = """
+    INSERT OR IGNORE INTO enrichment_queue (word_id, next_attempt_at, last_error, enqueued_at)
+    SELECT id, ?, ?, ? FROM words WHERE word = ?
+"""
+# 按下次尝试时间取出到期的单词，已有翻译的（例如手动修改过）也一并取出以便移出队列
+DUE_SQL = """
+    SELECT q.word_id, w.word, w.translation, q.attempts
+    FROM enrichment_queue q
+    JOIN words w ON w.id = q.word_id
+    WHERE q.next_attempt_at <= ? AND q.attempts < ?
+    ORDER BY q.next_attempt_at
+    LIMIT ?
+"""
+# 只在仍缺少翻译时写入，避免覆盖在此期间手动修改的内容
+FILL_INFO_SQL = """
+    UPDATE words SET translation = ?, phonetic = ?, example = ?
+    WHERE id = ? AND translation IS NULL
+"""
+DEQUEUE_SQL = "DELETE FROM enrichment_queue WHERE word_id = ?"
+# 在线查询熔断期间未能查询：只推迟，不增加尝试次数
+DEFER_SQL = "UPDATE enrichment_queue SET next_attempt_at = ?, last_error = ? WHERE word_id = ?"
+RESCHEDULE_SQL = """
+    UPDATE enrichment_queue SET attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+    WHERE word_id = ?
+"""
+QUEUE_STATUS_SQL = """
+    SELECT COUNT(*),
+           COALESCE(SUM(next_attempt_at <= ? AND attempts < ?), 0),
+           COALESCE(SUM(attempts >= ?), 0)
+    FROM enrichment_queue
+"""
+
+
+def retry_delay(attempts):
+    """第 attempts 次失败后到下次尝试的等待时间（秒）：指数增长，不超过 ENRICH_QUEUE_MAX_DELAY。"""
+    return min(queue_max_delay, queue_retry_seconds * 2 ** max(0, attempts - 1))
+
+
+def enqueue_words(conn, words, error, delay=None):
+    """
+    把查询失败的单词加入补查队列，delay 秒后开始重试（默认 ENRICH_QUEUE_RETRY_SECONDS）。
+    已在队列中的单词保持原有的尝试次数和时间。返回加入的单词数。
+    """
+    now = time.time()
+    next_attempt_at = now + (queue_retry_seconds if delay is None else delay)
+    before = conn.total_changes
+    with conn:
+        conn.executemany(ENQUEUE_SQL, ((next_attempt_at, error, now, word) for word in dict.fromkeys(words)))
+    return conn.total_changes - before
+
+
+def drain_once(conn, fetch_many=None, limit=None, now=None, paused=None):
+    """
+    处理一批到期的单词：已有翻译的直接移出队列；其余查询单词信息，查到的写回 words 表并移出队列，
+    查不到的增加尝试次数并按指数退避推迟下次尝试。
+    在线查询因熔断暂停时（paused() 为真或抛出 CircuitOpenError），查不到的单词只推迟到熔断恢复之后，
+    不增加尝试次数。
+    fetch_many 接收单词列表并返回 {单词: 单词信息或 None}，默认使用 api.fetch_words_info，
+    paused 默认使用 api.remote_paused。
+    返回 (补全数, 失败数, 处理的行数)；处理的行数为 0 表示没有到期的单词。
+    """
+    if fetch_many is None:
+        from api import fetch_words_info
+        fetch_many = fetch_words_info
+    if paused is None:
+        from api import remote_paused
+        paused = remote_paused
+    now = time.time() if now is None else now
+    rows = conn.execute(DUE_SQL, (now, queue_max_attempts, limit or queue_batch_size)).fetchall()
+    if not rows:
+        return 0, 0, 0
+
+    done = [(word_id,) for word_id, _, translation, _ in rows if translation is not None]
+    pending = [row for row in rows if row[2] is None]
+    infos = {}
+    error = None
+    circuit_open = False
+    if pending:
+        try:
+            infos = fetch_many([word for _, word, _, _ in pending])
+        except CircuitOpenError:
+            circuit_open = True
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        circuit_open = circuit_open or paused()
+
+    filled = []
+    failed = []
+    deferred = []
+    for word_id, word, _, attempts in pending:
+        info = infos.get(word)
+        if info:
+            filled.append((info['translation'], info['phonetic'], info['example'], word_id))
+        elif circuit_open:
+            deferred.append((now + breaker_reset_seconds, "在线查询熔断，已推迟", word_id))
+        else:
+            failed.append((now + retry_delay(attempts + 1), error or "未查询到单词信息", word_id))
+    with conn:
+        conn.executemany(FILL_INFO_SQL, filled)
+        conn.executemany(DEQUEUE_SQL, done + [(row[3],) for row in filled])
+        conn.executemany(RESCHEDULE_SQL, failed)
+        conn.executemany(DEFER_SQL, deferred)
+    return len(filled), len(failed), len(rows)
+
+
+def queue_status(conn, now=None):
+    """返回 (队列中的单词数, 已到期待补查的单词数, 已用尽重试次数的单词数)。"""
+    now = time.time() if now is None else now
+    return conn.execute(QUEUE_STATUS_SQL, (now, queue_max_attempts, queue_max_attempts)).fetchone()
+
+
+class EnrichmentDrainer:
+    """
+    后台补查线程：按令牌桶限制的速率（每批消耗一个令牌）逐批处理到期的单词，
+    没有到期单词时每隔 ENRICH_QUEUE_POLL_SECONDS 检查一次，wake() 可立即唤醒。
+    使用线程自己的数据库连接（database.get_connection），不阻塞界面和导入任务。
+    """
+
+    def __init__(self, fetch_many=None, rate=None, poll_seconds=None, on_filled=None):
+        self.fetch_many = fetch_many
+        self.poll_seconds = queue_poll_seconds if poll_seconds is None else poll_seconds
+        self.on_filled = on_filled
+        self.filled = 0
+        self.failed = 0
+        self._bucket = TokenBucket(queue_rate if rate is None else rate, 1)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="enrichment-drainer", daemon=True)
+        self._thread.start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        """请求停止并等待线程退出（timeout 为 None 时一直等待）；正在进行的在线查询不会被中断。"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        from database import get_connection
+        conn = get_connection()
+        while not self._stop.is_set():
+            self._bucket.acquire()
+            if self._stop.is_set():
+                break
+            try:
+                filled, failed, processed = drain_once(conn, self.fetch_many)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"补查单词信息出错: {e}")
+                filled, failed, processed = 0, 0, 0
+            self.filled += filled
+            self.failed += failed
+            if filled:
+                print(f"后台补查：已补全 {filled} 个单词的信息。")
+                if self.on_filled:
+                    self.on_filled(filled)
+            if not processed:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+
+if __name__ == "__main__":
+    # 命令行用法：
+    #   python enrichment_queue.py status    显示队列状态
+    #   python enrichment_queue.py drain     立即处理所有到期的单词（不限速）
+    from database import init_database, close_all_connections
+
+    conn, cursor = init_database()
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "drain":
+        total_filled = total_failed = 0
+        while True:
+            filled, failed, processed = drain_once(conn)
+            if not processed:
+                break
+            total_filled += filled
+            total_failed += failed
+        print(f"补全 {total_filled} 个单词，{total_failed} 个单词查询失败，已推迟重试。")
+    total, due, exhausted = queue_status(conn)
+    print(f"补查队列：共 {total} 个单词，{due} 个已到期，{exhausted} 个已用尽重试次数。")
+    close_all_connections()
@@ -1,133 +1,263 @@
+import hashlib
+import mmap
 import os
 import tkinter as tk
 from tkinter import messagebox
-from word_manager import query_word
+from importer import import_words, chunk_size
+from jobs import JobCancelled
 
-def read_txt_files(conn, cursor, output_text=None):
+# 流式读取文件时的缓冲块大小（字节）
+READ_BUFFER_SIZE = 1 << 20
+
+# 导入清单的读写语句
+MANIFEST_LOOKUP_SQL = "SELECT size, mtime_ns, content_hash, processed_offset FROM import_manifest WHERE path = ?"
+MANIFEST_UPSERT_SQL = """
+    INSERT OR REPLACE INTO import_manifest (path, size, mtime_ns, content_hash, processed_offset, processed_at)
+    VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+def _log(msg, output_text=None):
+    """输出日志到主窗口文本框，未提供文本框时打印到标准输出。"""
+    if output_text:
+        output_text.insert(tk.END, msg)
+    else:
+        print(msg)
+
+def _hash_prefix(path, length):
+    """
+    计算文件前 length 字节的 SHA-256。
+    返回哈希对象（可继续 update），文件长度不足时返回 None。
+    """
+    hasher = hashlib.sha256()
+    remaining = length
+    with open(path, 'rb') as file:
+        while remaining > 0:
+            block = file.read(min(remaining, 1 << 20))
+            if not block:
+                return None
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+def plan_file_import(cursor, path):
+    """
+    根据导入清单判断文件需要从哪里开始读取。
+    返回 (起始字节偏移, 已处理前缀的哈希对象, 文件状态)；文件自上次导入后未变化时返回 None。
+    文件内容仅在末尾追加时从上次处理的位置继续，否则从头读取。
+    """
+    stat = os.stat(path)
+    cursor.execute(MANIFEST_LOOKUP_SQL, (os.path.abspath(path),))
+    entry = cursor.fetchone()
+    if entry:
+        size, mtime_ns, content_hash, offset = entry
+        if size == stat.st_size and mtime_ns == stat.st_mtime_ns:
+            return None
+        if stat.st_size >= offset:
+            hasher = _hash_prefix(path, offset)
+            if hasher and hasher.hexdigest() == content_hash:
+                return offset, hasher, stat
+    return 0, hashlib.sha256(), stat
+
+def update_manifest(conn, path, size, mtime_ns, hasher, offset):
+    """记录文件已处理到的位置及对应前缀的哈希。"""
+    with conn:
+        conn.execute(MANIFEST_UPSERT_SQL, (os.path.abspath(path), size, mtime_ns, hasher.hexdigest(), offset))
+
+def list_word_files():
+    """列出当前目录下文件名包含 'word'（不区分大小写）的 .txt 文件。"""
+    return [f for f in os.listdir('.') if f.endswith('.txt') and ('word' in f.lower())]
+
+def scan_word_files(cursor):
+    """
+    扫描单词本文件并生成导入计划，供检测和导入共用，避免重复读取和校验文件。
+    返回 [(文件名, 导入计划或 None)]，导入计划含义见 plan_file_import。
+    """
+    return [(txt_file, plan_file_import(cursor, txt_file)) for txt_file in list_word_files()]
+
+def count_lines(path, start=0):
+    """
+    使用内存映射按块统计文件从 start 开始的行数，不把行内容读入内存。
+    末尾没有换行符的最后一行也计入。
+    """
+    size = os.path.getsize(path)
+    if size <= start:
+        return 0
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        lines = 0
+        for pos in range(start, size, READ_BUFFER_SIZE):
+            lines += mapped[pos:pos + READ_BUFFER_SIZE].count(b'\n')
+        if mapped[size - 1:size] != b'\n':
+            lines += 1
+    return lines
+
+def iter_word_batches(path, start=0, hasher=None, batch_size=None):
+    """
+    从 start 字节处开始按固定大小的缓冲块流式读取单词，每凑满 batch_size 个单词产出一批。
+    内存占用只与缓冲块大小和批大小有关，与文件大小无关。
+
+    参数:
+        path: 文件路径
+        start: 起始字节偏移（必须位于行首）
+        hasher: 可选的哈希对象，已完整处理的行会依次计入哈希
+        batch_size: 每批单词数，默认读取 IMPORT_CHUNK_SIZE
+    产出:
+        (单词列表, 已完整处理到的字节偏移)。末尾没有换行的最后一行可能仍在编辑，
+        其单词会产出，但不计入偏移，下次导入时重新处理。
+    """
+    batch_size = batch_size or chunk_size
+    words = []
+    offset = start
+    pending = b''
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while True:
+            block = file.read(READ_BUFFER_SIZE)
+            if not block:
+                break
+            data = pending + block
+            cut = data.rfind(b'\n') + 1
+            pending = data[cut:]
+            hashed = 0
+            pos = 0
+            for line in data[:cut].split(b'\n')[:-1]:
+                pos += len(line) + 1
+                word = line.decode('utf-8').strip()
+                if word:
+                    words.append(word)
+                if len(words) >= batch_size:
+                    if hasher:
+                        hasher.update(data[hashed:pos])
+                    hashed = pos
+                    yield words, offset + pos
+                    words = []
+            if hasher:
+                hasher.update(data[hashed:cut])
+            offset += cut
+    word = pending.decode('utf-8').strip()
+    if word:
+        words.append(word)
+    if words or offset > start:
+        yield words, offset
+
+def read_txt_files(conn, cursor, output_text=None, plans=None, job=None):
     """
     检测并读取当前目录下的 .txt 文件中的单词，支持重复检查，查询意思并添加到数据库。
     仅处理文件名中包含 'word' 或 'Word' 关键词的文件。
+    通过导入清单（import_manifest 表）增量导入：未变化的文件直接跳过，
+    仅在末尾追加了内容的文件只读取新增部分。文件按批流式读取，每批导入后记录进度。
     参数:
         conn: SQLite 数据库连接
         cursor: SQLite 数据库游标
         output_text: 主窗口的 ScrolledText，用于输出日志（可选）
+        plans: scan_word_files 生成的导入计划（可选），未提供时重新扫描
+        job: 后台任务句柄（可选），用于汇报进度和响应取消；取消后下次从已记录的位置继续
     """
-    msg = "\n=== 检测并读取 .txt 文件中的单词 ===\n"
-    if output_text:
-        output_text.insert(tk.END, msg)
-    else:
-        print(msg)
+    _log("\n=== 检测并读取 .txt 文件中的单词 ===\n", output_text)
     
-    txt_files = [f for f in os.listdir('.') if f.endswith('.txt') and ('word' in f.lower())]
+    if plans is None:
+        plans = scan_word_files(cursor)
     
-    if not txt_files:
-        msg = "当前目录下未找到文件名中包含 'word' 或 'Word' 的 .txt 文件。\n"
-        if output_text:
-            output_text.insert(tk.END, msg)
-        else:
-            print(msg)
+    if not plans:
+        _log("当前目录下未找到文件名中包含 'word' 或 'Word' 的 .txt 文件。\n", output_text)
         return
     
-    msg = f"找到 {len(txt_files)} 个 .txt 文件：{', '.join(txt_files)}\n"
-    if output_text:
-        output_text.insert(tk.END, msg)
-    else:
-        print(msg)
+    _log(f"找到 {len(plans)} 个 .txt 文件：{', '.join(txt_file for txt_file, _ in plans)}\n", output_text)
     
     total_words = 0
     added_words = 0
+    unchanged_files = 0
     
-    for txt_file in txt_files:
-        msg = f"正在读取文件: {txt_file}\n"
-        if output_text:
-            output_text.insert(tk.END, msg)
+    for txt_file, plan in plans:
+        if plan is None:
+            unchanged_files += 1
+            continue
+        offset, hasher, stat = plan
+        if offset:
+            _log(f"文件 {txt_file} 有新增内容，从第 {offset} 字节继续读取。\n", output_text)
         else:
-            print(msg)
-        
+            _log(f"正在读取文件: {txt_file}\n", output_text)
+
         try:
-            with open(txt_file, 'r', encoding='utf-8') as file:
-                words = [line.strip() for line in file if line.strip()]
-            msg = f"文件 {txt_file} 中读取了 {len(words)} 个单词。\n"
-            if output_text:
-                output_text.insert(tk.END, msg)
-            else:
-                print(msg)
-            total_words += len(words)
-            
-            for word in words:
-                cursor.execute("SELECT word FROM words WHERE word = ?", (word,))
-                if cursor.fetchone():
-                    msg = f"单词 '{word}' 已存在，跳过添加。\n"
-                    if output_text:
-                        output_text.insert(tk.END, msg)
-                    else:
-                        print(msg)
-                    continue
-                
-                try:
-                    word_info = query_word(word, conn, cursor)
-                    if word_info:
-                        msg = f"单词 '{word}' 已成功添加到数据库。\n"
-                        if output_text:
-                            output_text.insert(tk.END, msg)
-                    else:
-                        msg = f"查询单词 '{word}' 失败，仅保存单词到数据库。\n"
-                        if output_text:
-                            output_text.insert(tk.END, msg)
-                        cursor.execute("INSERT INTO words (word, status) VALUES (?, '未学习')", (word,))
-                        conn.commit()
-                        added_words += 1
-                except Exception as e:
-                    msg = f"处理单词 '{word}' 时出错: {e}\n"
-                    if output_text:
-                        output_text.insert(tk.END, msg)
-                    else:
-                        print(msg)
+            file_words = 0
+            processed = offset
+            for words, processed in iter_word_batches(txt_file, offset, hasher):
+                if job:
+                    job.check_cancelled()
+                    job.report_progress(processed, stat.st_size, f"读取 {txt_file}")
+                if words:
+                    file_words += len(words)
+                    added_words += import_words(conn, cursor, words, output_text, job)
+                # 批次之间记录已处理的长度而非文件大小，中断后下次从该位置继续
+                update_manifest(conn, txt_file, processed, stat.st_mtime_ns, hasher, processed)
+            update_manifest(conn, txt_file, stat.st_size, stat.st_mtime_ns, hasher, processed)
+            _log(f"文件 {txt_file} 中读取了 {file_words} 个单词。\n", output_text)
+            total_words += file_words
+        except JobCancelled:
+            raise
         except Exception as e:
-            msg = f"读取文件 {txt_file} 时出错: {e}\n"
-            if output_text:
-                output_text.insert(tk.END, msg)
-            else:
-                print(msg)
+            _log(f"读取文件 {txt_file} 时出错: {e}\n", output_text)
     
-    msg = f"读取完成！共读取 {total_words} 个单词，成功添加到数据库 {added_words} 个。\n"
-    if output_text:
-        output_text.insert(tk.END, msg)
-    else:
-        print(msg)
+    if unchanged_files:
+        _log(f"{unchanged_files} 个文件自上次导入后未变化，已跳过。\n", output_text)
+    _log(f"读取完成！共读取 {total_words} 个单词，成功添加到数据库 {added_words} 个。\n", output_text)
 
-def detect_txt_files(conn, cursor, output_text):
+def detect_word_files(cursor, job=None):
     """
-    检测当前目录下的 .txt 文件，显示文件列表和单词数量，并支持导入到数据库。
+    检测当前目录下的单词本 .txt 文件，逐个输出文件状态和待导入的行数。
     仅处理文件名中包含 'word' 或 'Word' 关键词的文件。
+    检测要校验文件前缀哈希并统计行数，耗时与文件大小成正比，应在后台任务中运行。
     参数:
-        conn: SQLite 数据库连接
         cursor: SQLite 数据库游标
-        output_text: 主窗口的 ScrolledText，用于输出日志
+        job: 后台任务句柄（可选），用于响应取消
+    返回:
+        (导入计划列表, 待导入总行数)，导入计划格式同 scan_word_files，可直接交给 read_txt_files
     """
-    output_text.insert(tk.END, "\n=== 检测单词本文件 (.txt) ===\n")
-    txt_files = [f for f in os.listdir('.') if f.endswith('.txt') and ('word' in f.lower())]
-    
+    print("\n=== 检测单词本文件 (.txt) ===")
+    txt_files = list_word_files()
+
     if not txt_files:
-        output_text.insert(tk.END, "当前目录下未找到文件名中包含 'word' 或 'Word' 的 .txt 文件。\n")
-        return
-    
-    output_text.insert(tk.END, f"找到 {len(txt_files)} 个 .txt 文件：\n")
-    file_word_counts = []
-    
+        print("当前目录下未找到文件名中包含 'word' 或 'Word' 的 .txt 文件。")
+        return [], 0
+
+    print(f"找到 {len(txt_files)} 个 .txt 文件：")
+    plans = []
+    total_lines = 0
+
     for idx, txt_file in enumerate(txt_files, 1):
+        if job:
+            job.check_cancelled()
         try:
-            with open(txt_file, 'r', encoding='utf-8') as file:
-                words = [line.strip() for line in file if line.strip()]
-            file_word_counts.append((txt_file, words))
-            output_text.insert(tk.END, f"{idx}. {txt_file} - 包含 {len(words)} 个单词\n")
+            plan = plan_file_import(cursor, txt_file)
+            plans.append((txt_file, plan))
+            if plan is None:
+                print(f"{idx}. {txt_file} - 自上次导入后未变化")
+                continue
+            lines = count_lines(txt_file, plan[0])
+            total_lines += lines
+            print(f"{idx}. {txt_file} - 待导入 {lines} 行")
         except Exception as e:
-            output_text.insert(tk.END, f"{idx}. {txt_file} - 读取错误: {e}\n")
-    
-    # 询问用户是否导入
-    if file_word_counts:
-        total_words = sum(len(words) for _, words in file_word_counts)
-        if messagebox.askyesno("导入确认", f"检测到 {len(file_word_counts)} 个文件，共 {total_words} 个单词。\n是否导入到数据库？"):
-            read_txt_files(conn, cursor, output_text)
+            print(f"{idx}. {txt_file} - 读取错误: {e}")
+    return plans, total_lines
+
+def confirm_import(conn, cursor, plans, total_lines, on_confirm=None, output_text=None):
+    """
+    根据 detect_word_files 的检测结果询问用户是否导入，在界面线程中调用。
+    参数:
+        conn: SQLite 数据库连接
+        cursor: SQLite 数据库游标
+        plans, total_lines: detect_word_files 的返回值
+        on_confirm: 用户确认导入后以导入计划调用（可选），用于在后台执行导入；未提供时直接导入
+        output_text: 直接导入时输出日志的 ScrolledText（可选）
+    """
+    pending_files = [txt_file for txt_file, plan in plans if plan is not None]
+    if not pending_files:
+        if plans:
+            print("没有需要导入的新内容。")
+        return
+    if messagebox.askyesno("导入确认", f"检测到 {len(pending_files)} 个文件有新内容，共 {total_lines} 行。\n是否导入到数据库？"):
+        if on_confirm:
+            on_confirm(plans)
         else:
-            output_text.insert(tk.END, "用户取消导入。\n")
\ No newline at end of file
+            read_txt_files(conn, cursor, output_text, plans=plans)
+    else:
+        print("用户取消导入。")
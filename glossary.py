@@ -0,0 +1,280 @@
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from dotenv import load_dotenv
+from cache import normalize_word
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 词汇表文件配置，从环境变量读取
+glossary_source = os.getenv("GLOSSARY_SOURCE", "glossary.tsv")  # 词汇表源文件（制表符分隔：单词、翻译、音标、例句）
+glossary_path = os.getenv("GLOSSARY_PATH", "glossary.bin")  # 编译后的索引文件，比源文件旧时自动重建
+
+# 索引文件格式（小端）：
+#   MAGIC | 条目数 N (uint32) | N 个记录偏移 (uint32，按键排序) | 记录区
+#   每条记录：规范化单词（UTF-8）\0 原单词\t翻译\t音标\t例句
+# 查询时用 mmap 映射文件，在偏移表上二分查找，只有访问到的页会被读入内存。
+MAGIC = b"BVGLOSS1"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<I")
+
+
+def read_source(path):
+    """读取 TSV 词汇表，返回 [(单词, 翻译, 音标, 例句)]；以 # 开头的行和列数不足的行跳过。"""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            fields = line.rstrip("\r\n").split("\t")
+            if len(fields) >= 4 and fields[0].strip():
+                entries.append(tuple(field.strip() for field in fields[:4]))
+    return entries
+
+
+def append_entries(entries, source=None):
+    """
+    把 [(单词, 翻译, 音标, 例句)] 追加到 TSV 词汇表，源文件中已有的单词（忽略大小写）不覆盖。
+    字段中的制表符和换行替换为空格。返回追加的条目数。
+    """
+    source = source or glossary_source
+    existing = {normalize_word(entry[0]) for entry in read_source(source)} if os.path.exists(source) else set()
+    lines = []
+    for entry in entries:
+        fields = [" ".join(str(field or "").split()) for field in entry]
+        key = normalize_word(fields[0])
+        if key and fields[1] and key not in existing:
+            existing.add(key)
+            lines.append("\t".join(fields) + "\n")
+    with open(source, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+    return len(lines)
+
+
+# ECDICT 翻译中的学科标记，如 “n. [生化] 组蛋白”；默认只转换生物、医学、化学相关的词条
+ECDICT_SUBJECTS = re.compile(r"\[(生|医|化|解|植|动|微|遗|药)")
+
+
+def read_ecdict(path, all_entries=False):
+    """
+    读取 ECDICT（https://github.com/skywind3000/ECDICT，MIT 许可）的 ecdict.csv，
+    返回 [(单词, 翻译, 音标, 例句)]。ECDICT 没有例句，例句为空；多行翻译用“；”连接。
+    all_entries 为 False 时只保留带生物、医学、化学学科标记的词条。
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            translation = row.get("translation") or ""
+            if not translation or not (all_entries or ECDICT_SUBJECTS.search(translation)):
+                continue
+            translation = "；".join(part.strip() for part in translation.replace("\\n", "\n").splitlines() if part.strip())
+            phonetic = row.get("phonetic") or ""
+            entries.append((row["word"], translation, f"/{phonetic}/" if phonetic else "", ""))
+    return entries
+
+
+def build_index(entries, path):
+    """
+    把 [(单词, 翻译, 音标, 例句)] 写成排序索引文件，同一单词（忽略大小写）只保留最后一条。
+    先写入临时文件再替换，正在读取旧索引的进程不受影响。返回条目数。
+    """
+    records = {}
+    for word, translation, phonetic, example in entries:
+        key = normalize_word(word).encode("utf-8")
+        value = "\t".join((word, translation, phonetic, example)).encode("utf-8")
+        records[key] = key + b"\0" + value
+    ordered = [records[key] for key in sorted(records)]
+
+    offsets = []
+    position = HEADER.size + OFFSET.size * len(ordered)
+    for record in ordered:
+        offsets.append(position)
+        position += len(record)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ordered)))
+        f.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+        f.write(b"".join(ordered))
+    os.replace(temp_path, path)
+    return len(ordered)
+
+
+class Glossary:
+    """
+    只读的词汇表索引，支持精确查找和前缀查找，均为 O(log N) 次二分比较。
+    path 为空或文件不存在时是空词汇表。同一实例可被多个线程共享。
+    """
+
+    def __init__(self, path=None):
+        self._file = None
+        self._map = None
+        self.count = 0
+        if path and os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                self.close()
+                raise ValueError(f"{path} 不是词汇表索引文件")
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, i):
+        start = OFFSET.unpack_from(self._map, HEADER.size + OFFSET.size * i)[0]
+        return start, self._map.find(b"\0", start)
+
+    def _lower_bound(self, key):
+        """返回第一个键不小于 key 的下标。"""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            start, end = self._key_at(mid)
+            if self._map[start:end] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _entry(self, i):
+        end = self._key_at(i)[1]
+        # 记录紧密排列，本记录在下一条记录的偏移处结束
+        if i + 1 < self.count:
+            stop = OFFSET.unpack_from(self._map, HEADER.size + OFFSET.size * (i + 1))[0]
+        else:
+            stop = len(self._map)
+        word, translation, phonetic, example = self._map[end + 1:stop].decode("utf-8").split("\t")
+        return word, {"translation": translation, "phonetic": phonetic, "example": example}
+
+    def lookup(self, word):
+        """精确查找（忽略大小写和多余空白），返回单词信息字典，未找到返回 None。"""
+        if not self.count:
+            return None
+        key = normalize_word(word).encode("utf-8")
+        i = self._lower_bound(key)
+        if i < self.count:
+            start, end = self._key_at(i)
+            if self._map[start:end] == key:
+                return self._entry(i)[1]
+        return None
+
+    def prefix(self, prefix, limit=10):
+        """前缀查找，返回按字母顺序排列的 [(单词, 单词信息字典)]，最多 limit 个。"""
+        if not self.count:
+            return []
+        key = normalize_word(prefix).encode("utf-8")
+        results = []
+        i = self._lower_bound(key)
+        while i < self.count and len(results) < limit:
+            start, end = self._key_at(i)
+            if not self._map[start:end].startswith(key):
+                break
+            results.append(self._entry(i))
+            i += 1
+        return results
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.count = 0
+
+
+def ensure_index(source=None, path=None):
+    """源文件存在且比索引文件新（或索引文件不存在）时重建索引，返回是否重建。"""
+    source = source or glossary_source
+    path = path or glossary_path
+    if not os.path.exists(source):
+        return False
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return False
+    build_index(read_source(source), path)
+    return True
+
+
+_glossary = None
+_glossary_lock = threading.Lock()
+
+
+def get_glossary():
+    """获取共享的词汇表索引，第一次调用时按需从源文件重建索引并映射到内存。"""
+    global _glossary
+    with _glossary_lock:
+        if _glossary is None:
+            try:
+                ensure_index()
+            except OSError as e:
+                print(f"重建词汇表索引失败: {e}")
+            _glossary = Glossary(glossary_path)
+        return _glossary
+
+
+if __name__ == "__main__":
+    # 命令行用法：
+    #   python glossary.py build [源文件.tsv] [索引文件.bin]   编译词汇表
+    #   python glossary.py lookup 单词                        精确查找，找不到时按前缀查找
+    #   python glossary.py bench [条目数]                     用随机单词测试查找耗时
+    #   python glossary.py export                            把单词库中信息完整的单词追加到词汇表
+    #   python glossary.py ecdict ecdict.csv [--all]          从 ECDICT 词典追加生物、医学、化学词条
+    # 随程序提供的 glossary.tsv 只是少量示例词条。实际使用时用 export 积累已查询过的单词，
+    # 或下载 ECDICT 的 ecdict.csv 后用 ecdict 转换；追加后运行 build（或重启程序）重建 glossary.bin。
+    import random
+    import string
+    import tempfile
+    import time
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        source = sys.argv[2] if len(sys.argv) > 2 else glossary_source
+        path = sys.argv[3] if len(sys.argv) > 3 else glossary_path
+        print(f"已写入 {build_index(read_source(source), path)} 个词条到 {path}")
+    elif command == "lookup":
+        glossary = get_glossary()
+        word = " ".join(sys.argv[2:])
+        info = glossary.lookup(word)
+        if info:
+            print(info)
+        else:
+            for match, info in glossary.prefix(word):
+                print(f"{match}: {info['translation']}")
+    elif command == "export":
+        from database import init_database, close_all_connections
+        from cache import PREWARM_SQL
+        conn, cursor = init_database()
+        added = append_entries(cursor.execute(PREWARM_SQL))
+        close_all_connections()
+        print(f"已向 {glossary_source} 追加 {added} 个词条，运行 python glossary.py build 重建索引。")
+    elif command == "ecdict":
+        added = append_entries(read_ecdict(sys.argv[2], all_entries="--all" in sys.argv[3:]))
+        print(f"已向 {glossary_source} 追加 {added} 个词条，运行 python glossary.py build 重建索引。")
+    elif command == "bench":
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+        rng = random.Random(0)
+        words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 14))) for _ in range(size)]
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, "glossary.bin")
+            start = time.perf_counter()
+            count = build_index(((w, f"{w}的释义", f"/{w}/", f"{w} | 例句") for w in words), path)
+            print(f"建立索引: {count} 个词条，{os.path.getsize(path) / 1e6:.1f} MB，耗时 {time.perf_counter() - start:.2f} 秒")
+            glossary = Glossary(path)
+            queries = rng.sample(words, 10000)
+            start = time.perf_counter()
+            found = sum(1 for word in queries if glossary.lookup(word))
+            elapsed = time.perf_counter() - start
+            print(f"精确查找: 命中 {found}/{len(queries)}，平均 {elapsed / len(queries) * 1e6:.1f} 微秒/次")
+            prefixes = [word[:3] for word in queries]
+            start = time.perf_counter()
+            for prefix in prefixes:
+                glossary.prefix(prefix, limit=10)
+            elapsed = time.perf_counter() - start
+            print(f"前缀查找（10 条）: 平均 {elapsed / len(prefixes) * 1e6:.1f} 微秒/次")
+            glossary.close()
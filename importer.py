@@ -0,0 +1,159 @@
+import os
+import tkinter as tk
+from dotenv import load_dotenv
+from cache import normalize_word
+from enrichment import enrich_words
+from enrichment_queue import enqueue_words
+from vocab_index import add_to_index
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 每个写入事务包含的行数
+chunk_size = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+
+# 候选单词临时表及批量入库语句
+CREATE_CANDIDATES_SQL = "CREATE TEMP TABLE IF NOT EXISTS import_candidates (seq INTEGER PRIMARY KEY, word TEXT UNIQUE NOT NULL)"
+INSERT_CANDIDATE_SQL = "INSERT OR IGNORE INTO import_candidates (seq, word) VALUES (?, ?)"
+# 候选单词与 words 表做一次集合差运算，得到真正新增的单词（忽略大小写，使用 idx_words_word_nocase）
+NEW_WORDS_SQL = """
+    SELECT c.word FROM import_candidates c
+    WHERE NOT EXISTS (SELECT 1 FROM words w WHERE w.word = c.word COLLATE NOCASE)
+    ORDER BY c.seq
+"""
+# 按 seq 区间把一块候选单词用一条语句写入 words 表。words 上有全文索引触发器，
+# 逐行执行语句时 FTS5 每条语句都要刷新一次索引，整块写入只刷新一次
+INSERT_NEW_WORDS_SQL = """
+    INSERT OR IGNORE INTO words (word, status)
+    SELECT c.word, '未学习' FROM import_candidates c
+    WHERE c.seq >= ? AND c.seq < ?
+      AND NOT EXISTS (SELECT 1 FROM words w WHERE w.word = c.word COLLATE NOCASE)
+    ORDER BY c.seq
+"""
+# 查询到的单词信息先装入临时表，再用一条 UPDATE 语句写回
+CREATE_INFOS_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS import_infos (
+        word TEXT PRIMARY KEY, translation TEXT, phonetic TEXT, example TEXT
+    )
+"""
+INSERT_INFO_SQL = "INSERT OR REPLACE INTO import_infos (word, translation, phonetic, example) VALUES (?, ?, ?, ?)"
+# 不使用 UPDATE ... FROM（需要 SQLite 3.33+）；行值赋值只需 3.15+，相关子查询按 import_infos 主键查找
+SAVE_INFO_SQL = """
+    UPDATE words
+    SET (translation, phonetic, example) = (
+        SELECT i.translation, i.phonetic, i.example FROM import_infos i WHERE i.word = words.word
+    )
+    WHERE word IN (SELECT word FROM import_infos)
+"""
+
+
+def _log(msg, output_text=None):
+    """输出日志到主窗口文本框，未提供文本框时打印到标准输出。"""
+    if output_text:
+        output_text.insert(tk.END, msg + "\n")
+    else:
+        print(msg)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def unique_words(words):
+    """按 normalize_word 去重（忽略大小写和多余空白），保留每个单词第一次出现的拼写和顺序。"""
+    unique = {}
+    for word in words:
+        unique.setdefault(normalize_word(word), word)
+    return list(unique.values())
+
+
+def stage_new_words(conn, words):
+    """
+    批量入库第一阶段：把候选单词装入临时表，用一次集合运算找出数据库中不存在的单词，
+    再按块从临时表 INSERT OR IGNORE 到 words 表，每块一个事务。
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接对象。
+        words (list[str]): 候选单词列表，可包含重复项（忽略大小写判断重复）。
+
+    Returns:
+        list[str]: 本次真正新增的单词，保持输入顺序。
+    """
+    candidates = unique_words(words)
+    conn.execute(CREATE_CANDIDATES_SQL)
+    try:
+        with conn:
+            conn.execute("DELETE FROM import_candidates")
+            for chunk in _chunks(list(enumerate(candidates)), chunk_size):
+                conn.executemany(INSERT_CANDIDATE_SQL, chunk)
+        new_words = [row[0] for row in conn.execute(NEW_WORDS_SQL)]
+        for start in range(0, len(candidates) if new_words else 0, chunk_size):
+            with conn:
+                conn.execute(INSERT_NEW_WORDS_SQL, (start, start + chunk_size))
+    finally:
+        with conn:
+            conn.execute("DELETE FROM import_candidates")
+    return new_words
+
+
+def save_word_infos(conn, word_infos):
+    """
+    把查询到的单词信息分块装入临时表，每块用一条 UPDATE 语句写回 words 表。
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接对象。
+        word_infos (dict): {单词: 单词信息字典}，值为空的单词跳过。
+    """
+    rows = [
+        (word, info['translation'], info['phonetic'], info['example'])
+        for word, info in word_infos.items() if info
+    ]
+    conn.execute(CREATE_INFOS_SQL)
+    try:
+        for chunk in _chunks(rows, chunk_size):
+            with conn:
+                conn.executemany(INSERT_INFO_SQL, chunk)
+                conn.execute(SAVE_INFO_SQL)
+                conn.execute("DELETE FROM import_infos")
+    finally:
+        with conn:
+            conn.execute("DELETE FROM import_infos")
+
+
+def import_words(conn, cursor, words, output_text=None, job=None):
+    """
+    批量导入单词：先整体入库去重，只对真正新增的单词并发查询信息，再批量写回。
+    查询失败（或因取消未查询）的单词先保存单词本身，并加入补查队列由后台稍后重试。
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接对象。
+        cursor (sqlite3.Cursor): 数据库游标对象。
+        words (list[str]): 待导入的单词列表。
+        output_text (tk.ScrolledText, optional): 主窗口的 ScrolledText，用于输出日志。
+        job (jobs.Job, optional): 后台任务句柄，用于汇报进度和响应取消。
+
+    Returns:
+        int: 新增到数据库的单词数量。
+    """
+    candidates = unique_words(words)
+    new_words = stage_new_words(conn, candidates)
+    add_to_index(new_words)
+    skipped = len(candidates) - len(new_words)
+    if skipped:
+        _log(f"{skipped} 个单词已存在，跳过添加。", output_text)
+    if not new_words:
+        return 0
+
+    _log(f"已添加 {len(new_words)} 个新单词，正在并发查询单词信息...", output_text)
+    report = enrich_words(new_words, job=job)
+    # 即使任务被取消，也先保存已查询到的结果，并把其余单词加入补查队列
+    save_word_infos(conn, report.results)
+    enqueue_words(conn, report.failed, "导入时查询失败")
+    if job:
+        job.check_cancelled()
+
+    for word in report.failed:
+        _log(f"查询单词 '{word}' 失败，已保存单词并加入补查队列。", output_text)
+    _log(report.summary(), output_text)
+    return len(new_words)
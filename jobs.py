@@ -0,0 +1,140 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 后台任务线程数
+job_workers = int(os.getenv("JOB_WORKERS", "2"))
+
+
+class JobCancelled(Exception):
+    """任务被用户取消时由 Job.check_cancelled 抛出。"""
+
+
+class Job:
+    """
+    后台任务句柄，在工作线程中传给任务函数。
+    任务函数通过 report_progress 汇报进度，并在适当位置调用 check_cancelled 响应取消。
+    """
+
+    def __init__(self, runner, name):
+        self.name = name
+        self._runner = runner
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """请求取消任务，任务函数在下一次 check_cancelled 时停止。"""
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.name)
+
+    def report_progress(self, done, total, message=None):
+        """汇报进度，可在工作线程中调用；进度回调在 Tk 主线程执行。"""
+        self._runner._results.put(("progress", self, (done, total, message)))
+
+
+class JobRunner:
+    """
+    后台任务执行器：任务在线程池中运行，结果和进度放入队列，
+    由 Tk 主线程通过 after() 定时取出并调用回调，回调中可以安全地操作界面。
+    """
+
+    def __init__(self, root, max_workers=None, poll_interval=100):
+        self.root = root
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or job_workers, thread_name_prefix="job")
+        self._results = queue.Queue()
+        self._callbacks = {}
+        self.active_jobs = []
+        self.root.after(self.poll_interval, self._poll)
+
+    def submit(self, name, func, *args, on_done=None, on_error=None, on_progress=None, on_finish=None, **kwargs):
+        """
+        提交后台任务，任务函数以 func(job, *args, **kwargs) 的形式在工作线程中调用。
+
+        Args:
+            name (str): 任务名称。
+            func (callable): 任务函数，第一个参数为 Job。
+            on_done (callable, optional): 任务成功时以返回值调用。
+            on_error (callable, optional): 任务抛出异常时以异常调用，未提供时打印错误。
+            on_progress (callable, optional): 以 (job, done, total, message) 调用。
+            on_finish (callable, optional): 任务结束（成功、失败或取消）后以 job 调用。
+
+        Returns:
+            Job: 任务句柄，可用于取消任务。
+        """
+        job = Job(self, name)
+        self._callbacks[job] = (on_done, on_error, on_progress, on_finish)
+        self.active_jobs.append(job)
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        try:
+            result = func(job, *args, **kwargs)
+            self._results.put(("done", job, result))
+        except JobCancelled:
+            self._results.put(("cancelled", job, None))
+        except Exception as e:
+            self._results.put(("error", job, e))
+
+    def _poll(self):
+        try:
+            while True:
+                kind, job, payload = self._results.get_nowait()
+                try:
+                    self._dispatch(kind, job, payload)
+                except Exception as e:
+                    # 回调出错不能中断轮询，否则之后的任务结果都无法处理
+                    print(f"任务 '{job.name}' 的回调出错: {e!r}")
+        except queue.Empty:
+            pass
+        finally:
+            try:
+                self.root.after(self.poll_interval, self._poll)
+            except Exception:
+                # 窗口已销毁，停止轮询
+                pass
+
+    def _dispatch(self, kind, job, payload):
+        on_done, on_error, on_progress, on_finish = self._callbacks.get(job, (None, None, None, None))
+        if kind == "progress":
+            if on_progress:
+                on_progress(job, *payload)
+            return
+        try:
+            if kind == "done" and on_done:
+                on_done(payload)
+            elif kind == "error":
+                if on_error:
+                    on_error(payload)
+                else:
+                    print(f"任务 '{job.name}' 出错: {payload}")
+            elif kind == "cancelled":
+                print(f"任务 '{job.name}' 已取消。")
+        finally:
+            # 即使结果回调出错，也要移除任务并调用 on_finish 做清理
+            self._callbacks.pop(job, None)
+            if job in self.active_jobs:
+                self.active_jobs.remove(job)
+            if on_finish:
+                on_finish(job)
+
+    def cancel_all(self):
+        for job in list(self.active_jobs):
+            job.cancel()
+
+    def shutdown(self, wait=True):
+        """取消所有任务，wait 为 True 时等待工作线程退出。"""
+        self.cancel_all()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,10 +1,22 @@
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from database import init_database, close_database
-from word_manager import query_word, view_words, mark_word_status, batch_add_words, view_mastery_level
+from database import init_database, get_connection, close_all_connections
+from word_manager import query_word, mark_word_status, batch_add_words, set_word_status, WORD_BY_ID_SQL
+from word_table import WordTableView, WORD_LIST_COLUMNS, MASTERY_COLUMNS
 from recitation import recitation_mode
-from file_reader import read_txt_files, detect_txt_files
-from Modify_vocabulary import modify_word_info
+from file_reader import read_txt_files, detect_word_files, confirm_import
+from importer import import_words
+from jobs import JobRunner
+from review_buffer import ReviewBuffer
+from vocab_index import get_index, complete_word
+from glossary import get_glossary
+from autocomplete import Autocomplete
+from enrichment_queue import EnrichmentDrainer
+from stats import show_stats_window
+from search import show_search_window
+from Modify_vocabulary import modify_word_info, PREVIEW_BY_ID_SQL, PREVIEW_BY_WORD_SQL
 from dotenv import load_dotenv
 
 # 加载 .env 文件中的环境变量
@@ -23,11 +35,21 @@ class WordMemoryApp:
             self.root.quit()
             return
 
-        # 启动时检测并读取 .txt 文件
-        read_txt_files(self.conn, self.cursor)
+        # 复习结果写后缓冲，启动时恢复上次未保存的复习记录
+        self.review_buffer = ReviewBuffer(self.conn)
+
+        # 后台任务执行器
+        self.jobs = JobRunner(self.root)
 
         # 创建主框架
         self.create_main_frame()
+
+        # 启动时在后台检测并读取 .txt 文件
+        self.run_in_background("导入单词本", lambda job, conn, cursor: read_txt_files(conn, cursor, job=job))
+        # 预先建立拼写纠错索引，避免第一次查询时等待
+        self.run_in_background("建立单词索引", lambda job, conn, cursor: get_index(cursor))
+        # 后台按限速补查导入时查询失败的单词
+        self.drainer = EnrichmentDrainer().start()
         
     def create_main_frame(self):
         # 顶部功能按钮区
@@ -36,9 +58,11 @@ class WordMemoryApp:
 
         buttons = [
             ("查询单词", self.query_word_window),
+            ("搜索单词", self.search_window),
             ("背诵模式", self.recitation_mode_window),
             ("查看单词列表", self.view_words),
             ("查看掌握程度", self.view_mastery_level),
+            ("学习统计", self.view_stats),
             ("标记单词状态", self.mark_status_window),
             ("修改单词信息", self.modify_word_window),
             ("检测单词本文件 (.txt)", self.detect_files),
@@ -50,15 +74,57 @@ class WordMemoryApp:
             btn = ttk.Button(button_frame, text=text, command=command)
             btn.pack(side=tk.LEFT, padx=5)
 
-        # 底部文本显示区
+        # 底部任务状态栏
+        status_frame = ttk.Frame(self.root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+        self.status_label = ttk.Label(status_frame, text="就绪")
+        self.status_label.pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(status_frame, text="取消任务", command=self.jobs.cancel_all, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+
+        # 文本显示区
         self.output_text = scrolledtext.ScrolledText(self.root, wrap=tk.WORD, height=30, width=90)
         self.output_text.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
 
         # 重定向 print 输出到文本框
         import sys
-        sys.stdout = TextRedirector(self.output_text)
+        self.redirector = TextRedirector(self.output_text)
+        sys.stdout = self.redirector
+
+    def run_in_background(self, name, func, on_done=None):
+        """
+        在后台线程运行任务，界面保持响应。
+        任务函数以 func(job, conn, cursor) 调用，使用工作线程自己的数据库连接，
+        任务失败或取消时回滚未提交的修改。
+        """
+        def task(job):
+            conn = get_connection()
+            try:
+                return func(job, conn, conn.cursor())
+            except BaseException:
+                conn.rollback()
+                raise
+
+        job = self.jobs.submit(name, task, on_done=on_done,
+                               on_progress=self.on_job_progress, on_finish=self.on_job_finish)
+        self.status_label.config(text=f"正在运行: {job.name}")
+        self.cancel_button.config(state=tk.NORMAL)
+        return job
+
+    def on_job_progress(self, job, done, total, message):
+        self.status_label.config(text=f"{job.name} - {message or ''} {done}/{total}")
+
+    def on_job_finish(self, job):
+        active = self.jobs.active_jobs
+        if active:
+            self.status_label.config(text=f"正在运行: {', '.join(j.name for j in active)}")
+        else:
+            self.status_label.config(text="就绪")
+            self.cancel_button.config(state=tk.DISABLED)
 
     def clear_output(self):
+        # 先写入缓冲中尚未显示的旧输出，再一并清空
+        self.redirector.flush_now()
         self.output_text.delete(1.0, tk.END)
 
     def query_word_window(self):
@@ -66,22 +132,42 @@ class WordMemoryApp:
         # 创建查询单词的子窗口
         query_win = tk.Toplevel(self.root)
         query_win.title("查询单词")
-        query_win.geometry("300x150")
+        query_win.geometry("300x180")
 
         ttk.Label(query_win, text="请输入要查询的单词：").pack(pady=5)
         word_entry = ttk.Entry(query_win, width=30)
         word_entry.pack(pady=5)
+        word_entry.focus()
+        Autocomplete(word_entry, self.complete_query)
+        # 勾选后不查找拼写相近的单词，直接在线查询
+        online_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(query_win, text="直接在线查询", variable=online_var).pack(pady=2)
 
         def submit():
             word = word_entry.get().strip()
+            suggest = not online_var.get()
             if word:
-                query_word(word, self.conn, self.cursor)
+                self.run_in_background("查询单词", lambda job, conn, cursor: query_word(word, conn, cursor, suggest=suggest))
             else:
                 messagebox.showwarning("警告", "请输入单词！")
             query_win.destroy()
 
         ttk.Button(query_win, text="查询", command=submit).pack(pady=5)
 
+    def complete_query(self, prefix, limit):
+        # 先补全单词库中的单词，不足时用本地词汇表中的词条补足
+        matches = complete_word(prefix, limit)
+        if len(matches) < limit:
+            seen = {match.lower() for match in matches}
+            for word, _ in get_glossary().prefix(prefix, limit):
+                if word.lower() not in seen and len(matches) < limit:
+                    matches.append(word)
+        return matches
+
+    def search_window(self):
+        # 双击搜索结果打开修改窗口
+        show_search_window(self.root, self.cursor, on_select=self.modify_word_window)
+
     def recitation_mode_window(self):
         self.clear_output()
         # 弹出选择背诵方式的窗口
@@ -104,15 +190,20 @@ class WordMemoryApp:
 
     def run_recitation(self, choice):
         self.clear_output()
-        recitation_mode(self.conn, self.cursor, choice=choice, output_text=self.output_text)
+        recitation_mode(self.conn, self.cursor, choice=choice, output_text=self.output_text,
+                        review_buffer=self.review_buffer)
 
     def view_words(self):
-        self.clear_output()
-        view_words(self.cursor)
+        self.review_buffer.flush()
+        WordTableView(self.root, self.cursor, WORD_LIST_COLUMNS, "单词列表")
 
     def view_mastery_level(self):
-        self.clear_output()
-        view_mastery_level(self.cursor, self.output_text)
+        self.review_buffer.flush()
+        WordTableView(self.root, self.cursor, MASTERY_COLUMNS, "单词掌握程度")
+
+    def view_stats(self):
+        self.review_buffer.flush()
+        show_stats_window(self.root, self.conn)
 
     def mark_status_window(self):
         self.clear_output()
@@ -136,22 +227,18 @@ class WordMemoryApp:
             try:
                 word_id = int(id_entry.get())
                 status = status_var.get()
-                self.cursor.execute("SELECT * FROM words WHERE id = ?", (word_id,))
+                # 先保存缓冲中的复习结果，避免稍后覆盖手动标记的状态
+                self.review_buffer.flush()
+                self.cursor.execute(WORD_BY_ID_SQL, (word_id,))
                 word = self.cursor.fetchone()
                 if not word:
                     messagebox.showerror("错误", "无效的 ID！")
                     return
                 status_map = {'1': '未学习', '2': '学习中', '3': '待巩固', '4': '已掌握'}
                 new_status = status_map.get(status, '未学习')
-                if new_status == '已掌握':
-                    self.cursor.execute("UPDATE words SET status = ?, easiness_factor = ? WHERE id = ?", 
-                                      (new_status, 2.8, word_id))
-                else:
-                    self.cursor.execute("UPDATE words SET status = ? WHERE id = ?", (new_status, word_id))
-                self.conn.commit()
+                set_word_status(self.conn, self.cursor, word_id, new_status)
                 messagebox.showinfo("成功", f"单词 '{word[1]}' 已标记为 '{new_status}'。")
-                self.clear_output()
-                view_words(self.cursor)
+                self.view_words()
             except ValueError:
                 messagebox.showerror("错误", "请输入有效的 ID！")
             mark_win.destroy()
@@ -160,7 +247,15 @@ class WordMemoryApp:
 
     def detect_files(self):
         self.clear_output()
-        detect_txt_files(self.conn, self.cursor, self.output_text)
+        # 检测要校验文件哈希并统计行数，在后台运行，完成后回到界面线程询问是否导入
+        def on_detected(result):
+            self.redirector.flush_now()
+            confirm_import(self.conn, self.cursor, *result, on_confirm=lambda plans: self.run_in_background(
+                "导入单词本", lambda job, conn, cursor: read_txt_files(conn, cursor, plans=plans, job=job)
+            ))
+
+        self.run_in_background("检测单词本", lambda job, conn, cursor: detect_word_files(cursor, job=job),
+                               on_done=on_detected)
 
     def batch_add_window(self):
         self.clear_output()
@@ -179,24 +274,16 @@ class WordMemoryApp:
             if not words:
                 messagebox.showwarning("警告", "未输入任何单词！")
                 return
-            for word in words:
-                self.cursor.execute("SELECT word FROM words WHERE word = ?", (word,))
-                if self.cursor.fetchone():
-                    self.output_text.insert(tk.END, f"单词 '{word}' 已存在，跳过添加。\n")
-                    continue
-                word_info = query_word(word, self.conn, self.cursor)
-                if word_info:
-                    self.output_text.insert(tk.END, f"单词 '{word}' 已成功添加到数据库。\n")
-                else:
-                    self.output_text.insert(tk.END, f"查询单词 '{word}' 失败，仅保存单词到数据库。\n")
-                    self.cursor.execute("INSERT INTO words (word, status) VALUES (?, '未学习')", (word,))
-                    self.conn.commit()
-            self.output_text.insert(tk.END, "批量添加完成！\n")
+            self.run_in_background(
+                "批量添加单词",
+                lambda job, conn, cursor: import_words(conn, cursor, words, job=job),
+                on_done=lambda added: self.output_text.insert(tk.END, "批量添加完成！\n")
+            )
             batch_win.destroy()
 
         ttk.Button(batch_win, text="提交", command=submit).pack(pady=10)
 
-    def modify_word_window(self):
+    def modify_word_window(self, word_id=None):
         self.clear_output()
         # 创建修改单词信息的子窗口
         modify_win = tk.Toplevel(self.root)
@@ -242,9 +329,9 @@ class WordMemoryApp:
             try:
                 if search_mode.get() == "id":
                     word_id = int(search_value)
-                    self.cursor.execute("SELECT id, word, translation, example FROM words WHERE id = ?", (word_id,))
+                    self.cursor.execute(PREVIEW_BY_ID_SQL, (word_id,))
                 else:
-                    self.cursor.execute("SELECT id, word, translation, example FROM words WHERE word = ?", (search_value,))
+                    self.cursor.execute(PREVIEW_BY_WORD_SQL, (search_value,))
                 
                 word_data = self.cursor.fetchone()
                 if not word_data:
@@ -282,40 +369,104 @@ class WordMemoryApp:
                 
                 if success:
                     messagebox.showinfo("成功", "单词信息已更新！")
-                    self.clear_output()
-                    view_words(self.cursor)
+                    self.view_words()
                 else:
                     messagebox.showerror("错误", "修改失败，请检查输入！")
                 modify_win.destroy()
             except Exception as e:
                 messagebox.showerror("错误", f"提交失败: {e}")
 
+        # 按单词查找时输入即补全，选中候选后直接预览
+        Autocomplete(
+            search_entry,
+            lambda prefix, limit: complete_word(prefix, limit) if search_mode.get() == "word" else [],
+            on_select=lambda word: preview(),
+        )
+
         # 按钮区域
         button_frame = ttk.Frame(modify_win)
         button_frame.pack(pady=10)
         ttk.Button(button_frame, text="预览", command=preview).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="提交", command=submit).pack(side=tk.LEFT, padx=5)
 
+        # 从搜索窗口打开时直接预览选中的单词
+        if word_id is not None:
+            search_entry.insert(0, str(word_id))
+            preview()
+
     def quit_app(self):
-        close_database(self.conn)
+        # 先等后台补查线程和所有任务退出，再关闭数据库连接，避免关闭正在写入的连接
+        self.jobs.cancel_all()
+        self.drainer.stop()
+        self.jobs.shutdown(wait=True)
+        self.review_buffer.close()
+        close_all_connections()
         self.root.quit()
 
 # 重定向窗口
 class TextRedirector:
-    def __init__(self, text_widget):
+    """
+    把 print 输出重定向到文本框。
+    write 只把文本追加到缓冲区，可在任意线程调用；Tk 主线程每隔 flush_interval 毫秒
+    通过 after() 把缓冲区一次性插入文本框，行数超过 max_lines + trim_block 时整块删除旧行。
+    """
+
+    def __init__(self, text_widget, max_lines=1000, flush_interval=50, trim_block=500):
         self.text_widget = text_widget
-        self.max_lines = 1000
-    
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        self.trim_block = trim_block
+        self._buffer = []
+        self._lock = threading.Lock()
+        # 统计信息，用于衡量日志输出的开销
+        self.writes = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.text_widget.after(self.flush_interval, self._poll)
+
     def write(self, text):
+        if not text:
+            return
+        with self._lock:
+            self._buffer.append(text)
+            self.writes += 1
+
+    def _poll(self):
+        try:
+            self.flush_now()
+            self.text_widget.after(self.flush_interval, self._poll)
+        except tk.TclError:
+            # 文本框已销毁，停止轮询
+            pass
+
+    def flush_now(self):
+        """把缓冲区内容一次性写入文本框，只能在 Tk 主线程调用。"""
+        with self._lock:
+            if not self._buffer:
+                return
+            text = "".join(self._buffer)
+            self._buffer.clear()
+        start = time.perf_counter()
         self.text_widget.insert(tk.END, text)
         self.text_widget.see(tk.END)
         line_count = int(self.text_widget.index('end-1c').split('.')[0])
-        if line_count > self.max_lines:
+        if line_count > self.max_lines + self.trim_block:
             self.text_widget.delete(1.0, f"{line_count - self.max_lines}.0")
+        self.flushes += 1
+        self.flush_seconds += time.perf_counter() - start
 
     def flush(self):
+        # 由 Tk 主线程定时刷新，这里无需处理
         pass
 
+    def stats(self):
+        """返回写入次数、刷新次数和平均每次刷新耗时（毫秒）。"""
+        return {
+            'writes': self.writes,
+            'flushes': self.flushes,
+            'avg_flush_ms': self.flush_seconds * 1000 / self.flushes if self.flushes else 0.0
+        }
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = WordMemoryApp(root)
@@ -0,0 +1,229 @@
+import itertools
+import os
+from dotenv import load_dotenv
+from scheduler import (
+    DEFAULT_EASINESS, DEFAULT_PARAMS, MASTERED, sm2_update_arrays, save_params,
+)
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 拟合配置，从环境变量读取
+target_retention = float(os.getenv("FIT_TARGET_RETENTION", "0.85"))  # 目标记忆保持率
+min_reviews = int(os.getenv("FIT_MIN_REVIEWS", "200"))  # 拟合所需的最少复习记录数
+max_cards = int(os.getenv("FIT_MAX_CARDS", "5000"))  # 参与评估的最多单词数（超出时随机抽样）
+mastery_horizon = float(os.getenv("FIT_MASTERY_HORIZON", "90"))  # 已掌握单词在多少天后仍需记住
+
+# 候选参数网格，默认参数总是包含在内
+PARAM_GRID = {
+    "first_interval": [1, 2],
+    "second_interval": [3, 4, 6, 8],
+    "ef_step": [0.05, 0.1, 0.15, 0.2],
+    "max_easiness": [2.8, 3.1, 3.5],
+    "mastery_easiness": [2.8, 3.1, 3.5],
+}
+
+# 按单词和时间顺序读取复习日志，并计算距同一单词上一次复习的实际天数
+REVIEW_HISTORY_SQL = """
+    SELECT word_id, quality, prev_interval, prev_repetitions, prev_easiness_factor,
+           (reviewed_at - LAG(reviewed_at) OVER (PARTITION BY word_id ORDER BY reviewed_at)) / 86400.0
+    FROM reviews
+    ORDER BY word_id, reviewed_at
+"""
+
+
+def load_history(cursor):
+    """
+    读取复习日志，返回数组字典：word_id、quality、prev_interval、prev_repetitions、
+    prev_easiness_factor 和 elapsed（距上一次复习的天数，第一次复习时取上次间隔）。
+    """
+    import numpy as np
+
+    rows = cursor.execute(REVIEW_HISTORY_SQL).fetchall()
+    columns = list(zip(*rows)) if rows else [()] * 6
+    word_id, quality, prev_interval, prev_repetitions, prev_easiness, elapsed = columns
+    history = {
+        "word_id": np.array(word_id, dtype=np.int64),
+        "quality": np.array(quality, dtype=np.int64),
+        "prev_interval": np.array([v or 0 for v in prev_interval], dtype=np.int64),
+        "prev_repetitions": np.array([v or 0 for v in prev_repetitions], dtype=np.int64),
+        "prev_easiness_factor": np.array(
+            [DEFAULT_EASINESS if v is None else v for v in prev_easiness], dtype=np.float64
+        ),
+    }
+    elapsed = np.array([np.nan if v is None else v for v in elapsed], dtype=np.float64)
+    history["elapsed"] = np.where(np.isnan(elapsed), history["prev_interval"], elapsed)
+    return history
+
+
+def _stability(weights, easiness_factor, repetitions):
+    """记忆稳定性（天）：log S = w0 + w1 × log(EF) + w2 × log(1 + 复习次数)。"""
+    import numpy as np
+
+    return np.exp(weights[0] + weights[1] * np.log(easiness_factor) + weights[2] * np.log1p(repetitions))
+
+
+def fit_memory_model(history, iterations=2000, learning_rate=0.05):
+    """
+    用复习日志拟合遗忘曲线 P(记住) = exp(-间隔天数 / S)，S 由 _stability 给出。
+    只使用已学过（prev_repetitions > 0）的复习；对整个日志批量计算梯度，以 Adam 最大化对数似然。
+    返回权重数组 [w0, w1, w2]。
+    """
+    import numpy as np
+
+    mask = (history["prev_repetitions"] > 0) & (history["elapsed"] > 0)
+    elapsed = history["elapsed"][mask]
+    recalled = (history["quality"][mask] >= 3).astype(np.float64)
+    features = np.stack([
+        np.ones_like(elapsed),
+        np.log(history["prev_easiness_factor"][mask]),
+        np.log1p(history["prev_repetitions"][mask]),
+    ])
+
+    weights = np.array([np.log(10.0), 0.0, 1.0])
+    moment = np.zeros(3)
+    velocity = np.zeros(3)
+    for step in range(1, iterations + 1):
+        ratio = elapsed / np.exp(weights @ features)
+        p = np.clip(np.exp(-ratio), 1e-6, 1 - 1e-6)
+        # d log L / d w = (y - (1 - y) p / (1 - p)) × (t / S) × x
+        gradient = features @ ((recalled - (1 - recalled) * p / (1 - p)) * ratio) / len(elapsed)
+        moment = 0.9 * moment + 0.1 * gradient
+        velocity = 0.999 * velocity + 0.001 * gradient ** 2
+        weights += learning_rate * (moment / (1 - 0.9 ** step)) / (np.sqrt(velocity / (1 - 0.999 ** step)) + 1e-8)
+    return weights
+
+
+def candidate_params():
+    """展开 PARAM_GRID 中所有有效的参数组合（掌握阈值不超过易度因子上限），默认参数排在第一位。"""
+    keys = list(PARAM_GRID)
+    candidates = [dict(DEFAULT_PARAMS)]
+    for values in itertools.product(*PARAM_GRID.values()):
+        params = dict(zip(keys, values))
+        if params["mastery_easiness"] <= params["max_easiness"] and params != DEFAULT_PARAMS:
+            candidates.append(params)
+    return candidates
+
+
+def _quality_sequences(history, seed=None):
+    """把复习日志整理为每个单词的评分序列矩阵（不足的位置填 -1）和每个单词首次复习前的状态。"""
+    import numpy as np
+
+    word_ids, starts, counts = np.unique(history["word_id"], return_index=True, return_counts=True)
+    if len(word_ids) > max_cards:
+        chosen = np.sort(np.random.default_rng(seed).choice(len(word_ids), max_cards, replace=False))
+        starts, counts = starts[chosen], counts[chosen]
+    positions = np.arange(counts.max())
+    valid = positions < counts[:, None]
+    index = np.where(valid, starts[:, None] + positions, 0)
+    sequences = np.where(valid, history["quality"][index], -1)
+    initial = (
+        history["prev_interval"][starts],
+        history["prev_repetitions"][starts],
+        history["prev_easiness_factor"][starts],
+    )
+    return sequences, initial
+
+
+def evaluate(candidates, history, weights, seed=None):
+    """
+    按日志中每个单词的评分序列，用每组候选参数重放调度，所有单词和候选参数同时计算。
+    每次排定的复习间隔 I 的预测保持率为 exp(-I / S)，复习负担为 1 / I（每个单词每天的复习次数）；
+    单词被判定为已掌握后不再复习，以 mastery_horizon 天后的预测保持率计入。
+
+    Returns:
+        tuple: (预测保持率数组, 复习负担数组)，长度等于候选参数个数。
+    """
+    import numpy as np
+
+    sequences, (interval, repetitions, easiness) = _quality_sequences(history, seed)
+    params = {key: np.array([c[key] for c in candidates])[:, None] for key in DEFAULT_PARAMS}
+    shape = (len(candidates), len(sequences))
+    interval = np.broadcast_to(interval, shape).copy()
+    repetitions = np.broadcast_to(repetitions, shape).copy()
+    easiness = np.broadcast_to(easiness, shape).copy()
+    active = np.ones(shape, dtype=bool)
+
+    retention_sum = np.zeros(len(candidates))
+    load_sum = np.zeros(len(candidates))
+    events = np.zeros(len(candidates))
+    for quality in sequences.T:
+        step = active & (quality >= 0)
+        new_interval, new_repetitions, new_easiness, status = sm2_update_arrays(
+            quality, interval, repetitions, easiness, params
+        )
+        new_interval = np.maximum(new_interval, 1)
+        mastered = step & (status == MASTERED)
+        scheduled = step & ~mastered
+        stability = _stability(weights, new_easiness, new_repetitions)
+        retention_sum += np.where(scheduled, np.exp(-new_interval / stability), 0).sum(axis=1)
+        retention_sum += np.where(mastered, np.exp(-mastery_horizon / stability), 0).sum(axis=1)
+        load_sum += np.where(scheduled, 1 / new_interval, 0).sum(axis=1)
+        events += step.sum(axis=1)
+        interval = np.where(step, new_interval, interval)
+        repetitions = np.where(step, new_repetitions, repetitions)
+        easiness = np.where(step, new_easiness, easiness)
+        active &= ~mastered
+    events = np.maximum(events, 1)
+    return retention_sum / events, load_sum / events
+
+
+def fit_params(cursor, target=None, seed=0):
+    """
+    从复习日志拟合 SM2 参数：在保持率不低于 target 的候选参数中选复习负担最小的一组；
+    没有候选参数达到目标时选保持率最高的一组。
+
+    Returns:
+        dict: params（拟合参数）、retention、load、default_retention、default_load、reviews_used。
+
+    Raises:
+        ValueError: 复习记录少于 FIT_MIN_REVIEWS 条。
+    """
+    import numpy as np
+
+    target = target or target_retention
+    history = load_history(cursor)
+    if len(history["quality"]) < min_reviews:
+        raise ValueError(f"复习记录只有 {len(history['quality'])} 条，至少需要 {min_reviews} 条才能拟合参数")
+
+    weights = fit_memory_model(history)
+    candidates = candidate_params()
+    retention, load = evaluate(candidates, history, weights, seed)
+    feasible = retention >= target
+    if feasible.any():
+        best = int(np.argmin(np.where(feasible, load, np.inf)))
+    else:
+        best = int(np.argmax(retention))
+    return {
+        "params": candidates[best],
+        "retention": float(retention[best]),
+        "load": float(load[best]),
+        "default_retention": float(retention[0]),
+        "default_load": float(load[0]),
+        "reviews_used": len(history["quality"]),
+    }
+
+
+if __name__ == "__main__":
+    # 命令行用法：python optimizer.py [目标保持率] [--dry-run]
+    # 拟合当前单词库（DECK_NAME）的 SM2 参数并保存，背诵模式随后使用新参数
+    import sys
+    from database import init_database, close_all_connections
+
+    args = [arg for arg in sys.argv[1:] if arg != "--dry-run"]
+    target = float(args[0]) if args else target_retention
+    conn, cursor = init_database()
+    try:
+        result = fit_params(cursor, target)
+    except ValueError as e:
+        print(e)
+        close_all_connections()
+        sys.exit(1)
+    print(f"默认参数: 预测保持率 {result['default_retention']:.1%}，复习负担 {result['default_load']:.3f} 次/词/天")
+    print(f"拟合参数: 预测保持率 {result['retention']:.1%}，复习负担 {result['load']:.3f} 次/词/天")
+    print(f"参数: {result['params']}")
+    if "--dry-run" not in sys.argv:
+        save_params(conn, result["params"], target_retention=target, predicted_retention=result["retention"],
+                    predicted_load=result["load"], reviews_used=result["reviews_used"])
+        print("已保存拟合参数。")
+    close_all_connections()
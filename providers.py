@@ -0,0 +1,138 @@
+import os
+import threading
+from dotenv import load_dotenv
+from cache import get_cache
+from glossary import get_glossary
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 查询链配置，从环境变量读取
+provider_order = os.getenv("LOOKUP_PROVIDERS", "glossary,cache,openai")  # 按顺序查询的数据源
+
+
+class LookupProvider:
+    """
+    单词信息数据源。子类至少覆盖 lookup 和 lookup_many 之一：
+    lookup(单词) 返回单词信息字典或 None，默认通过 lookup_many 查询单个单词；
+    lookup_many(单词列表) 返回 {单词: 单词信息字典}，只包含查到的单词，默认逐个调用 lookup。
+    能批量查询的数据源应覆盖 lookup_many。
+    store_many 保存其他数据源查到的结果（可选，默认不保存）。
+    """
+
+    name = "base"
+
+    @property
+    def available(self):
+        return True
+
+    def lookup(self, word):
+        if type(self).lookup_many is LookupProvider.lookup_many:
+            raise NotImplementedError(f"{type(self).__name__} 必须实现 lookup 或 lookup_many")
+        return self.lookup_many([word]).get(word)
+
+    def lookup_many(self, words):
+        if type(self).lookup is LookupProvider.lookup:
+            raise NotImplementedError(f"{type(self).__name__} 必须实现 lookup 或 lookup_many")
+        results = {}
+        for word in words:
+            info = self.lookup(word)
+            if info:
+                results[word] = info
+        return results
+
+    def store_many(self, items):
+        pass
+
+
+class GlossaryProvider(LookupProvider):
+    """本地词汇表（glossary.Glossary 内存映射索引），索引文件不存在时视为空表。"""
+
+    name = "glossary"
+
+    def lookup(self, word):
+        return get_glossary().lookup(word)
+
+
+class CacheProvider(LookupProvider):
+    """在线查询结果的本地缓存（cache.LookupCache），按模型和提示词版本区分。"""
+
+    name = "cache"
+
+    def lookup_many(self, words):
+        from api import model, PROMPT_VERSION
+        return get_cache().get_many(model, PROMPT_VERSION, words)
+
+    def store_many(self, items):
+        from api import model, PROMPT_VERSION
+        get_cache().put_many(model, PROMPT_VERSION, items)
+
+
+class OpenAIProvider(LookupProvider):
+    """OpenAI 在线查询，未设置 OPENAI_API_KEY 时不可用；客户端在第一次查询时才创建。"""
+
+    name = "openai"
+
+    @property
+    def available(self):
+        from api import api_key
+        return bool(api_key)
+
+    def lookup_many(self, words):
+        from api import fetch_remote
+        return {word: info for word, info in fetch_remote(words).items() if info}
+
+
+PROVIDERS = {
+    "glossary": GlossaryProvider,
+    "cache": CacheProvider,
+    "openai": OpenAIProvider,
+}
+
+
+class ProviderChain:
+    """
+    按顺序查询多个数据源：前一个数据源未查到的单词交给下一个。
+    后面的数据源查到的结果会写回前面的数据源（例如在线查询结果写入缓存）。
+    """
+
+    def __init__(self, providers):
+        self.providers = providers
+        self._warned = set()
+
+    def lookup_many(self, words):
+        """返回 {单词: 单词信息字典}，只包含查到的单词。"""
+        results = {}
+        remaining = list(dict.fromkeys(words))
+        for i, provider in enumerate(self.providers):
+            if not remaining:
+                break
+            if not provider.available:
+                if provider.name not in self._warned:
+                    self._warned.add(provider.name)
+                    print(f"数据源 '{provider.name}' 不可用（未配置），已跳过。")
+                continue
+            found = provider.lookup_many(remaining)
+            if found:
+                for earlier in self.providers[:i]:
+                    earlier.store_many(found)
+                results.update(found)
+                remaining = [word for word in remaining if word not in found]
+        return results
+
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def get_chain():
+    """获取按 LOOKUP_PROVIDERS 配置的共享查询链。"""
+    global _chain
+    with _chain_lock:
+        if _chain is None:
+            names = [name.strip() for name in provider_order.split(",") if name.strip()]
+            unknown = [name for name in names if name not in PROVIDERS]
+            if unknown:
+                raise ValueError(f"未知的数据源: {', '.join(unknown)}，可选: {', '.join(PROVIDERS)}")
+            _chain = ProviderChain([PROVIDERS[name]() for name in names])
+        return _chain
@@ -0,0 +1,149 @@
+import sqlite3
+import sys
+import Modify_vocabulary
+import cache
+import enrichment_queue
+import file_reader
+import importer
+import optimizer
+import recitation
+import review_buffer
+import scheduler
+import search
+import vocab_index
+import stats
+import word_manager
+from database import init_database, close_all_connections
+from word_table import WORD_LIST_COLUMNS, MASTERY_COLUMNS
+
+
+def app_queries():
+    """
+    列出程序执行的所有查询：(名称, SQL, 示例参数, 是否允许扫描)。
+    “允许扫描”只用于本身就需要遍历、或按索引顺序扫描且受 LIMIT 限制的查询。
+    """
+    queries = [
+        ("查询单词", word_manager.WORD_LOOKUP_SQL, ("histone",), False),
+        ("按 ID 读取单词", word_manager.WORD_BY_ID_SQL, (1,), False),
+        # 全文检索由 FTS5 虚拟表完成（SCAN ... VIRTUAL TABLE），按 rank 排序不需要临时 B 树
+        ("全文搜索", *search.build_search_query("histone 蛋白"), True),
+        ("短中文词搜索", *search.build_search_query("蛋白 酶"), False),
+        ("短词搜索", *search.build_search_query("AT"), False),
+        # 建立模糊查找索引时读取全部单词（覆盖索引扫描）
+        ("读取全部单词", vocab_index.ALL_WORDS_SQL, (), True),
+        ("添加单词", word_manager.INSERT_WORD_SQL, ("histone", "", "", ""), False),
+        ("标记状态", word_manager.SET_STATUS_SQL, ("学习中", 1), False),
+        ("取消已掌握", word_manager.UNMASTER_SQL, ("学习中", 0.0, 2.5, 1), False),
+        ("标记已掌握", word_manager.SET_STATUS_AND_EF_SQL, ("已掌握", scheduler.DEFAULT_PARAMS["mastery_easiness"], 1), False),
+        # 命令行模式输出全部单词，本身就是全表遍历
+        ("命令行单词列表", word_manager.LIST_WORDS_SQL, (), True),
+        ("命令行掌握程度", word_manager.LIST_MASTERY_SQL, (), True),
+        ("修改预览（ID）", Modify_vocabulary.PREVIEW_BY_ID_SQL, (1,), False),
+        ("修改预览（单词）", Modify_vocabulary.PREVIEW_BY_WORD_SQL, ("histone",), False),
+        ("修改前读取", Modify_vocabulary.CURRENT_INFO_SQL, (1,), False),
+        ("修改翻译和例句", Modify_vocabulary.UPDATE_INFO_SQL, ("", "", 1), False),
+        ("复习队列", recitation.REVIEW_QUEUE_SQL, (0.0, 100), False),
+        ("读取复习单词", recitation.REVIEW_ROWS_SQL.format("?, ?, ?"), (1, 2, 3), False),
+        ("是否有单词", recitation.HAS_WORDS_SQL, (), True),
+        # 部分索引只包含未掌握的单词，取到第一条即停止
+        ("是否有未掌握单词", recitation.HAS_UNMASTERED_SQL, (), True),
+        ("更新 SM2 参数", review_buffer.UPDATE_SM2_SQL, ("学习中", 1, 1, 2.5, 0.0, 1), False),
+        ("追加复习日志", review_buffer.INSERT_REVIEW_SQL, (1, 0.0, 4, 0, 0, 0, 2.5, 1, 1, 2.6, "学习中"), False),
+        ("每日复习统计", stats.DAILY_STATS_SQL, ("2025-01-01",), False),
+        # 复习量预测读取所有未掌握单词
+        ("读取预测状态", scheduler.DECK_STATE_SQL, (), True),
+        ("读取调度参数", scheduler.LOAD_PARAMS_SQL, ("default",), False),
+        ("保存调度参数", scheduler.SAVE_PARAMS_SQL, ("default", "{}", 0.9, 0.9, 0.0, 0, 0.0), False),
+        # 参数拟合读取完整复习日志，按 (word_id, reviewed_at) 唯一索引顺序扫描
+        ("读取复习历史", optimizer.REVIEW_HISTORY_SQL, (), True),
+        ("写入候选单词", importer.INSERT_CANDIDATE_SQL, (0, "histone"), False),
+        ("写入单词信息临时表", importer.INSERT_INFO_SQL, ("histone", "", "", ""), False),
+        # 扫描的是本批候选单词的临时表，words 表按唯一索引查找
+        ("计算新增单词", importer.NEW_WORDS_SQL, (), True),
+        ("写入新增单词", importer.INSERT_NEW_WORDS_SQL, (0, 5000), False),
+        # 遍历本块单词信息临时表的主键，words 表按唯一索引查找
+        ("写回单词信息", importer.SAVE_INFO_SQL, (), False),
+        ("读取导入清单", file_reader.MANIFEST_LOOKUP_SQL, ("words.txt",), False),
+        ("写入导入清单", file_reader.MANIFEST_UPSERT_SQL, ("words.txt", 0, 0, "", 0), False),
+        # 用单词库预热查询缓存，读取全部信息完整的单词
+        ("预热查询缓存", cache.PREWARM_SQL, (), True),
+        ("加入补查队列", enrichment_queue.ENQUEUE_SQL, (0.0, "", 0.0, "histone"), False),
+        ("读取到期补查单词", enrichment_queue.DUE_SQL, (0.0, 12, 20), False),
+        ("写入补查结果", enrichment_queue.FILL_INFO_SQL, ("", "", "", 1), False),
+        ("移出补查队列", enrichment_queue.DEQUEUE_SQL, (1,), False),
+        ("推迟补查", enrichment_queue.RESCHEDULE_SQL, (0.0, "", 1), False),
+        ("熔断时推迟补查", enrichment_queue.DEFER_SQL, (0.0, "", 1), False),
+        # 队列状态统计需要遍历整个队列
+        ("补查队列状态", enrichment_queue.QUEUE_STATUS_SQL, (0.0, 12, 12), True),
+    ]
+    # 分页视图：每种排序列和方向的第一页（按索引顺序扫描，受 LIMIT 限制）和后续页
+    for name, columns in (("单词列表", WORD_LIST_COLUMNS), ("掌握程度", MASTERY_COLUMNS)):
+        column_names = [col[0] for col in columns]
+        for sort_by in word_manager.SORT_COLUMNS:
+            if sort_by not in column_names:
+                continue
+            for descending in (False, True):
+                label = f"{name}按 {sort_by} {'降序' if descending else '升序'}"
+                sql, params = word_manager.build_page_query(column_names, sort_by, descending, None, 26)
+                queries.append((f"{label}第一页", sql, params, True))
+                sql, params = word_manager.build_page_query(column_names, sort_by, descending, (0, 0), 26)
+                queries.append((f"{label}翻页", sql, params, False))
+    return queries
+
+
+def cache_queries():
+    """
+    列出查询缓存（cache.py，独立的数据库文件）执行的查询，格式同 app_queries。
+    """
+    return [
+        ("读取查询缓存", cache.GET_SQL, ("model", "histone", "v1"), False),
+        ("检查缓存是否存在", cache.EXISTS_SQL, ("model", "histone", "v1"), False),
+        ("更新缓存访问时间", cache.TOUCH_SQL, (0.0, "model", "histone", "v1"), False),
+        ("写入查询缓存", cache.PUT_SQL, ("model", "histone", "v1", "", "", "", 0.0, 0.0), False),
+        # 统计条目数和清理过期条目都需要遍历缓存，只在打开缓存和条目数超过上限时执行
+        ("缓存条目数", cache.COUNT_SQL, (), True),
+        ("清理过期缓存", cache.EXPIRE_SQL, (0.0,), True),
+        # 按 idx_lookup_cache_accessed 顺序取最旧的条目，受 LIMIT 限制
+        ("淘汰最旧缓存", cache.EVICT_SQL, (100,), True),
+    ]
+
+
+def _check_plans(conn, queries):
+    problems = []
+    for name, sql, params, allow_scan in queries:
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params):
+            detail = row[3]
+            if "USE TEMP B-TREE" in detail or (detail.startswith("SCAN") and not allow_scan):
+                problems.append((name, detail))
+    return problems
+
+
+def find_plan_problems(conn):
+    """
+    对每个查询执行 EXPLAIN QUERY PLAN，返回问题列表 [(名称, 执行计划明细)]。
+    不允许扫描的查询出现 SCAN 即视为问题；任何查询需要临时 B 树排序也视为问题。
+    """
+    conn.execute(importer.CREATE_CANDIDATES_SQL)
+    conn.execute(importer.CREATE_INFOS_SQL)
+    problems = _check_plans(conn, app_queries())
+    # 缓存查询在一个按 cache.py 建表语句创建的内存数据库上检查
+    cache_conn = sqlite3.connect(":memory:")
+    try:
+        cache_conn.execute(cache.CREATE_CACHE_SQL)
+        cache_conn.execute(cache.CREATE_CACHE_INDEX_SQL)
+        problems += _check_plans(cache_conn, cache_queries())
+    finally:
+        cache_conn.close()
+    return problems
+
+
+if __name__ == "__main__":
+    # 命令行用法：python query_plan.py，有查询需要全表扫描或临时排序时以状态码 1 退出
+    conn, cursor = init_database()
+    problems = find_plan_problems(conn)
+    close_all_connections()
+    if problems:
+        for name, detail in problems:
+            print(f"[失败] {name}: {detail}")
+        sys.exit(1)
+    print("所有查询均使用索引。")
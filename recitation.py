@@ -1,10 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import os
 import random
+import time
+from dotenv import load_dotenv
+from review_buffer import ReviewBuffer
+from vocab_index import grade_answer
+from scheduler import sm2_update, load_params, DEFAULT_EASINESS
 
-def recitation_mode(conn, cursor, choice="1", output_text=None):
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 每次背诵最多加载的单词数
+session_limit = int(os.getenv("RECITATION_LIMIT", "100"))
+
+# 复习队列：已到期且未掌握的单词 ID，按到期时间排序，只读取覆盖索引 idx_words_review_queue
+REVIEW_QUEUE_SQL = """
+    SELECT id FROM words
+    WHERE status != '已掌握' AND due_at <= ?
+    ORDER BY due_at
+    LIMIT ?
+"""
+# 按 ID 读取队列中单词的完整信息，占位符个数与 ID 数量一致
+REVIEW_ROWS_SQL = "SELECT * FROM words WHERE id IN ({})"
+# 是否存在单词 / 未掌握的单词（条件与部分索引 idx_words_review_queue 相同，读到第一条即返回）
+HAS_WORDS_SQL = "SELECT 1 FROM words LIMIT 1"
+HAS_UNMASTERED_SQL = "SELECT 1 FROM words INDEXED BY idx_words_review_queue WHERE status != '已掌握' LIMIT 1"
+
+def recitation_mode(conn, cursor, choice="1", output_text=None, review_buffer=None):
     """
-    背诵模式，基于间隔重复（SM2 算法）显示需要复习的单词，优先易度因子低的单词。
+    背诵模式，基于间隔重复（SM2 算法）显示已到期需要复习的单词，最早到期的单词优先。
     提供两种背诵方式：
     1. 显示英文，询问是否认识，显示信息后确认记忆正确性或继续。
     2. 显示中文，输入英文单词。
@@ -14,18 +39,22 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
         cursor: SQLite 数据库游标
         choice: 背诵模式（"1" 或 "2"）
         output_text: 主窗口的 ScrolledText，用于输出日志
+        review_buffer: 复习结果写后缓冲（可选），未提供时为本次背诵单独创建，结束时关闭
     """
-    # 查询需要复习的单词（状态不为“已掌握”）
-    cursor.execute("SELECT * FROM words WHERE status != '已掌握' ORDER BY easiness_factor ASC, repetitions ASC")
-    words_to_review = cursor.fetchall()
+    # 查询已到期且需要复习的单词（状态不为“已掌握”），最早到期的优先，最多取 RECITATION_LIMIT 个
+    cursor.execute(REVIEW_QUEUE_SQL, (time.time(), session_limit))
+    word_ids = [row[0] for row in cursor.fetchall()]
+    words_to_review = []
+    if word_ids:
+        cursor.execute(REVIEW_ROWS_SQL.format(", ".join("?" * len(word_ids))), word_ids)
+        words_to_review = cursor.fetchall()
     
     # 如果没有需要复习的单词
     if not words_to_review:
-        cursor.execute("SELECT COUNT(*) FROM words")
-        total_words = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM words WHERE status = '已掌握'")
-        mastered_words = cursor.fetchone()[0]
-        if total_words > 0 and total_words == mastered_words:
+        cursor.execute(HAS_WORDS_SQL)
+        has_words = cursor.fetchone() is not None
+        cursor.execute(HAS_UNMASTERED_SQL)
+        if has_words and cursor.fetchone() is None:
             msg = "所有单词均已掌握，学习完成！\n"
         else:
             msg = "当前没有需要复习的单词！\n"
@@ -35,7 +64,7 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
             print(msg)
         return
     
-    # 随机打乱单词列表（保留排序优先级）
+    # 随机打乱单词列表
     words_to_review = list(words_to_review)
     random.shuffle(words_to_review)
     
@@ -48,9 +77,35 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
     recitation_win.geometry("400x500")
     recitation_win.grab_set()
 
+    # 复习结果先写入缓冲，批量保存到数据库
+    own_buffer = review_buffer is None
+    if own_buffer:
+        review_buffer = ReviewBuffer(conn)
+
+    def flush_timer():
+        """定时检查缓冲是否需要写入数据库"""
+        review_buffer.flush_if_due()
+        timer_id[0] = recitation_win.after(1000, flush_timer)
+
+    timer_id = [recitation_win.after(1000, flush_timer)]
+
+    def end_session():
+        """保存缓冲中的复习结果并关闭背诵窗口"""
+        recitation_win.after_cancel(timer_id[0])
+        if own_buffer:
+            review_buffer.close()
+        else:
+            review_buffer.flush()
+        recitation_win.destroy()
+
+    # 当前单词库的 SM2 参数（拟合结果或默认值）
+    params = load_params(cursor)
+
     # 当前单词索引
     current_index = tk.IntVar(value=0)
     total_words = len(words_to_review)
+    # 当前单词的显示时间和作答用时（毫秒），写入复习日志
+    timing = {"shown_at": time.monotonic(), "latency_ms": None}
 
     # 显示进度
     progress_label = ttk.Label(recitation_win, text=f"进度: 1/{total_words}")
@@ -80,16 +135,19 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
     def update_word_display():
         """更新当前单词的显示内容"""
         if current_index.get() >= total_words:
-            cursor.execute("SELECT * FROM words WHERE status != '已掌握'")
-            if not cursor.fetchall():
+            review_buffer.flush()
+            cursor.execute(HAS_UNMASTERED_SQL)
+            if not cursor.fetchone():
                 output_text.insert(tk.END, "所有单词均已掌握，学习完成！\n")
             else:
                 output_text.insert(tk.END, "本次背诵结束！\n")
-            recitation_win.destroy()
+            end_session()
             return
 
         word_data = words_to_review[current_index.get()]
         progress_label.config(text=f"进度: {current_index.get() + 1}/{total_words}")
+        timing["shown_at"] = time.monotonic()
+        timing["latency_ms"] = None
         
         # 清空按钮
         for widget in button_frame.winfo_children():
@@ -102,13 +160,18 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
             ttk.Button(button_frame, text="认识", command=lambda: on_known(word_data)).pack(side=tk.LEFT, padx=5)
             ttk.Button(button_frame, text="不认识", command=lambda: on_unknown(word_data)).pack(side=tk.LEFT, padx=5)
         else:
-            word_label.config(text=f"中文翻译: {word_data[2]}")
+            word_label.config(text=f"中文翻译: {word_data[2] or '（暂无翻译，正在后台补查）'}")
             info_label.config(text="")
             word_entry.pack(side=tk.LEFT, pady=5)
             ttk.Button(button_frame, text="提交", command=on_submit).pack(side=tk.LEFT, padx=5)
             word_entry.delete(0, tk.END)
             word_entry.focus()
 
+    def record_latency():
+        """记录从显示单词到第一次作答的用时"""
+        if timing["latency_ms"] is None:
+            timing["latency_ms"] = int((time.monotonic() - timing["shown_at"]) * 1000)
+
     def show_word_info(word_data):
         """显示单词的详细信息"""
         info_text = f"单词: {word_data[1]}\n翻译: {word_data[2]}\n音标: {word_data[3]}\n例句: {word_data[4]}"
@@ -116,6 +179,7 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
 
     def on_known(word_data):
         """模式 1: 用户选择‘认识’"""
+        record_latency()
         show_word_info(word_data)
         # 清空按钮并显示新按钮
         for widget in button_frame.winfo_children():
@@ -127,6 +191,7 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
 
     def on_unknown(word_data):
         """模式 1: 用户选择‘不认识’"""
+        record_latency()
         show_word_info(word_data)
         # 清空按钮并显示继续按钮
         for widget in button_frame.winfo_children():
@@ -136,41 +201,21 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
     def process_response(quality):
         """处理用户响应并更新 SM2 参数"""
         word_data = words_to_review[current_index.get()]
-        interval = word_data[6] if word_data[6] is not None else 0
-        repetitions = word_data[7] if word_data[7] is not None else 0
-        easiness_factor = word_data[8] if word_data[8] is not None else 2.5
+        previous = (
+            word_data[6] if word_data[6] is not None else 0,
+            word_data[7] if word_data[7] is not None else 0,
+            word_data[8] if word_data[8] is not None else DEFAULT_EASINESS,
+        )
+        record_latency()
 
         # SM2 算法更新
-        if quality >= 3:
-            if repetitions == 0:
-                interval = 1
-            elif repetitions == 1:
-                interval = 6
-            else:
-                interval = int(interval * easiness_factor)
-            repetitions += 1
-        else:
-            repetitions = 0
-            interval = 1
-
-        easiness_factor = max(1.3, min(2.8, easiness_factor + 0.1 * (quality - 3)))
-
-        # 确定状态
-        if easiness_factor >= 2.8:
-            new_status = '已掌握'
-        elif repetitions >= 3 and easiness_factor >= 2.0:
-            new_status = '待巩固'
-        elif repetitions > 0:
-            new_status = '学习中'
-        else:
-            new_status = '未学习'
+        interval, repetitions, easiness_factor, new_status = sm2_update(quality, *previous, params=params)
+
+        # 下次到期时间 = 当前时间 + 间隔天数
+        due_at = time.time() + interval * 86400
 
-        cursor.execute("""
-            UPDATE words 
-            SET status = ?, interval = ?, repetitions = ?, easiness_factor = ?
-            WHERE word = ?
-        """, (new_status, interval, repetitions, easiness_factor, word_data[1]))
-        conn.commit()
+        review_buffer.add(word_data[0], new_status, interval, repetitions, easiness_factor, due_at,
+                          quality, previous, latency_ms=timing["latency_ms"])
 
         if output_text:
             output_text.insert(tk.END, f"单词 '{word_data[1]}' 已标记为 {new_status}。\n")
@@ -190,12 +235,19 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
             return
         if user_input.lower() == 'q':
             output_text.insert(tk.END, "退出背诵模式。\n")
-            recitation_win.destroy()
+            end_session()
             return
         
-        quality = 4 if user_input.lower() == word_data[1].lower() else 2
+        record_latency()
+        # 只差一处拼写错误时按 3 分计（仍算答对）
+        quality, _ = grade_answer(user_input, word_data[1])
         if output_text:
-            output_text.insert(tk.END, "正确！\n" if quality == 4 else f"错误！正确答案是: {word_data[1]}\n")
+            if quality == 4:
+                output_text.insert(tk.END, "正确！\n")
+            elif quality == 3:
+                output_text.insert(tk.END, f"基本正确，有一处拼写错误！正确答案是: {word_data[1]}\n")
+            else:
+                output_text.insert(tk.END, f"错误！正确答案是: {word_data[1]}\n")
         show_word_info(word_data)
         # 添加继续按钮
         for widget in button_frame.winfo_children():
@@ -209,14 +261,15 @@ def recitation_mode(conn, cursor, choice="1", output_text=None):
     style.configure("Red.TButton", background="red", foreground="white")
     style.configure("Blue.TButton", background="blue", foreground="white")
 
-    # 绑定 Enter 键到“继续”按钮
+    # 绑定 Enter 键到“继续”按钮：调用按钮自身的命令，保留创建按钮时确定的评分
     def on_return(event):
-        if button_frame.winfo_children() and button_frame.winfo_children()[0].cget("text") == "继续":
-            process_response(2)
+        buttons = button_frame.winfo_children()
+        if buttons and buttons[0].cget("text") == "继续":
+            buttons[0].invoke()
     
     recitation_win.bind('<Return>', on_return)
 
     # 初始显示第一个单词
     update_word_display()
 
-    recitation_win.protocol("WM_DELETE_WINDOW", lambda: [output_text.insert(tk.END, "退出背诵模式。\n"), recitation_win.destroy()])
\ No newline at end of file
+    recitation_win.protocol("WM_DELETE_WINDOW", lambda: [output_text.insert(tk.END, "退出背诵模式。\n"), end_session()])
\ No newline at end of file
@@ -0,0 +1,229 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dotenv import load_dotenv
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 在线查询的重试和熔断配置，从环境变量读取
+max_retries = int(os.getenv("API_MAX_RETRIES", "3"))  # 暂时性错误的最大重试次数
+retry_base_delay = float(os.getenv("API_RETRY_BASE_DELAY", "0.5"))  # 第一次重试前的最长等待（秒），之后每次翻倍
+retry_max_delay = float(os.getenv("API_RETRY_MAX_DELAY", "8"))  # 单次重试等待的上限（秒）
+breaker_threshold = int(os.getenv("API_BREAKER_THRESHOLD", "5"))  # 连续失败多少次后熔断
+breaker_reset_seconds = float(os.getenv("API_BREAKER_RESET_SECONDS", "30"))  # 熔断后多久放行一次试探请求
+
+# 可重试的 HTTP 状态码：超时、冲突、限流；5xx 也会重试
+RETRYABLE_STATUS = (408, 409, 429)
+# 可重试的异常类名（openai 的连接错误和超时），按名称判断以免导入 openai 包
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError")
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发出。"""
+
+
+def is_fatal(error):
+    """
+    判断异常是否为重试也无法解决的请求错误（密钥无效、模型不存在、请求格式错误等 4xx），
+    这类错误说明配置有问题，后续请求同样会失败。
+    """
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in RETRYABLE_STATUS
+
+
+def is_transient(error):
+    """判断异常是否为暂时性错误（网络错误、超时、限流或服务端错误），只有这类错误值得重试。"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+class CircuitBreaker:
+    """
+    连续失败 threshold 次后打开熔断器，reset_seconds 内的调用直接抛出 CircuitOpenError；
+    之后进入半开状态，只放行一个试探请求，成功则关闭熔断器，失败则重新打开。
+    认证、配置类错误（is_fatal）立即打开熔断器。
+    同一实例可被多个线程共享。
+    """
+
+    def __init__(self, threshold=None, reset_seconds=None):
+        self.threshold = breaker_threshold if threshold is None else threshold
+        self.reset_seconds = breaker_reset_seconds if reset_seconds is None else reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0  # 熔断次数
+        self.rejected = 0  # 因熔断被拒绝的调用次数
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "open" or (self.state == "half_open" and self._probing):
+                self.rejected += 1
+                raise CircuitOpenError("在线查询连续失败，已暂停请求，稍后自动恢复")
+            if self.state == "half_open":
+                self._probing = True
+
+    def _on_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def _on_failure(self, trip=False):
+        with self._lock:
+            self.failures += 1
+            if trip or self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def call(self, func):
+        """
+        调用 func()；熔断器打开时不调用并抛出 CircuitOpenError。
+        暂时性错误计为一次失败，认证、配置类错误直接熔断；其他异常（如回复格式错误）说明服务可用，计为成功。
+        """
+        if self.threshold <= 0:
+            return func()
+        self._before_call()
+        try:
+            result = func()
+        except Exception as e:
+            if is_transient(e):
+                self._on_failure()
+            elif is_fatal(e):
+                self._on_failure(trip=True)
+            else:
+                self._on_success()
+            raise
+        self._on_success()
+        return result
+
+    @property
+    def is_open(self):
+        """熔断器打开且尚未到放行试探请求的时间。"""
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self._opened_at < self.reset_seconds
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "opened": self.opened, "rejected": self.rejected}
+
+
+class RetryPolicy:
+    """
+    指数退避重试：第 n 次重试前等待 [0, min(max_delay, base_delay * 2^(n-1))] 内的随机时间（full jitter），
+    避免多个线程同时失败后又同时重试。只重试 is_transient 判定的暂时性错误。
+    """
+
+    def __init__(self, retries=None, base_delay=None, max_delay=None, sleep=time.sleep):
+        self.retries = max_retries if retries is None else retries
+        self.base_delay = retry_base_delay if base_delay is None else base_delay
+        self.max_delay = retry_max_delay if max_delay is None else max_delay
+        self.sleep = sleep
+        self.attempts = 0  # 实际发出的调用次数
+        self.retried = 0  # 重试次数
+        self.gave_up = 0  # 重试用尽后仍失败的次数
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def delay(self, retry):
+        """第 retry 次重试（从 1 开始）前的等待时间。"""
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    def call(self, func):
+        retry = 0
+        while True:
+            with self._lock:
+                self.attempts += 1
+            try:
+                return func()
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if retry >= self.retries:
+                    with self._lock:
+                        self.gave_up += 1
+                    raise
+                retry += 1
+                with self._lock:
+                    self.retried += 1
+                print(f"在线查询暂时失败（{e}），第 {retry} 次重试...")
+                self.sleep(self.delay(retry))
+
+    def stats(self):
+        with self._lock:
+            return {"attempts": self.attempts, "retried": self.retried, "gave_up": self.gave_up}
+
+
+class SingleFlight:
+    """
+    合并相同键的并发调用：某个键的请求正在进行时，其他线程对同一键的调用等待并共用它的结果，
+    不再重复请求。同一实例可被多个线程共享。
+    """
+
+    def __init__(self):
+        self.calls = 0  # 实际执行 func 的次数
+        self.coalesced = 0  # 等待其他线程结果的键数
+        self._flights = {}  # 键 -> Future
+        self._lock = threading.Lock()
+
+    def do_many(self, items, func, key=None):
+        """
+        对 items 中尚无进行中请求的部分调用 func(列表)，func 返回 {项: 结果}；
+        其余项等待正在进行的请求。返回 {项: 结果}，func 未返回的项对应 None。
+        key(项) 用于判断两个项是否相同，默认为项本身。
+        """
+        key = key or (lambda item: item)
+        owned = []
+        waiting = []
+        with self._lock:
+            for item in dict.fromkeys(items):
+                k = key(item)
+                future = self._flights.get(k)
+                if future is None:
+                    future = self._flights[k] = Future()
+                    owned.append((item, k, future))
+                else:
+                    waiting.append((item, future))
+                    self.coalesced += 1
+            if owned:
+                self.calls += 1
+
+        results = {}
+        if owned:
+            try:
+                found = func([item for item, _, _ in owned])
+                for item, _, future in owned:
+                    results[item] = found.get(item)
+                    future.set_result(results[item])
+            except BaseException as e:
+                for _, _, future in owned:
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    for _, k, _ in owned:
+                        self._flights.pop(k, None)
+        for item, future in waiting:
+            results[item] = future.result()
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._flights)}
@@ -0,0 +1,132 @@
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 写后缓冲配置，从环境变量读取
+flush_every = int(os.getenv("REVIEW_FLUSH_EVERY", "10"))  # 累计多少个回答后写入数据库
+flush_seconds = float(os.getenv("REVIEW_FLUSH_SECONDS", "30"))  # 距上次写入超过多少秒后写入数据库
+journal_path = os.getenv("REVIEW_JOURNAL_PATH", "review_journal.jsonl")  # 未写入回答的日志文件
+journal_fsync = os.getenv("REVIEW_JOURNAL_FSYNC", "0") == "1"  # 每条日志是否 fsync（防断电，速度较慢）
+
+# 按主键更新单词的 SM2 参数
+UPDATE_SM2_SQL = """
+    UPDATE words
+    SET status = ?, interval = ?, repetitions = ?, easiness_factor = ?, due_at = ?
+    WHERE id = ?
+"""
+# 追加复习日志；重放日志时同一单词同一时刻的记录已存在则跳过，触发器同时更新每日汇总
+INSERT_REVIEW_SQL = """
+    INSERT OR IGNORE INTO reviews (
+        word_id, reviewed_at, quality, latency_ms,
+        prev_interval, prev_repetitions, prev_easiness_factor,
+        new_interval, new_repetitions, new_easiness_factor, new_status
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ReviewBuffer:
+    """
+    SM2 复习结果的写后缓冲。
+    每个回答先追加到日志文件，再暂存在内存中；累计 flush_every 个回答、距上次写入超过
+    flush_seconds 秒或调用 flush/close 时，在一个事务中批量更新单词的 SM2 参数、
+    追加 reviews 复习日志（触发器同时更新 review_daily 每日汇总），并清空日志文件。
+    程序崩溃后，下次创建缓冲时会重放日志中尚未写入的回答。
+    同一实例只应在创建它的线程中使用。
+    """
+
+    def __init__(self, conn, every=None, seconds=None, path=None):
+        self.conn = conn
+        self.every = every or flush_every
+        self.seconds = flush_seconds if seconds is None else seconds
+        self.path = path or journal_path
+        self._pending = {}
+        self._reviews = []
+        self._last_flush = time.monotonic()
+        self._replay()
+        self._journal = open(self.path, "a", encoding="utf-8")
+
+    def _replay(self):
+        """把上次未写入数据库的回答从日志重放到数据库。"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时写了一半的最后一行
+                    continue
+                self._pending[record["id"]] = record
+                if "quality" in record:
+                    self._reviews.append(record)
+        if self._pending:
+            print(f"从复习日志恢复了 {len(self._pending)} 条未保存的复习记录。")
+            self._write_pending()
+        open(self.path, "w").close()
+
+    def add(self, word_id, status, interval, repetitions, easiness_factor, due_at,
+            quality, previous, latency_ms=None, reviewed_at=None):
+        """
+        记录一个回答，达到数量或时间阈值时写入数据库。
+        previous 为回答前的 (interval, repetitions, easiness_factor)，
+        latency_ms 为从显示单词到作答的毫秒数。
+        """
+        record = {
+            "id": word_id,
+            "status": status,
+            "interval": interval,
+            "repetitions": repetitions,
+            "easiness_factor": easiness_factor,
+            "due_at": due_at,
+            "quality": quality,
+            "previous": list(previous),
+            "latency_ms": latency_ms,
+            "reviewed_at": time.time() if reviewed_at is None else reviewed_at,
+        }
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        if journal_fsync:
+            os.fsync(self._journal.fileno())
+        self._pending[word_id] = record
+        self._reviews.append(record)
+        if len(self._reviews) >= self.every:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """距上次写入超过 flush_seconds 秒时写入数据库，可由定时器周期调用。"""
+        if self._pending and time.monotonic() - self._last_flush >= self.seconds:
+            self.flush()
+
+    def _write_pending(self):
+        with self.conn:
+            self.conn.executemany(UPDATE_SM2_SQL, [
+                (r["status"], r["interval"], r["repetitions"], r["easiness_factor"], r["due_at"], r["id"])
+                for r in self._pending.values()
+            ])
+            self.conn.executemany(INSERT_REVIEW_SQL, [
+                (r["id"], r["reviewed_at"], r["quality"], r["latency_ms"], *r["previous"],
+                 r["interval"], r["repetitions"], r["easiness_factor"], r["status"])
+                for r in self._reviews
+            ])
+        self._pending.clear()
+        self._reviews.clear()
+
+    def flush(self):
+        """把缓冲中的所有回答在一个事务中写入数据库，并清空日志。"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        self._write_pending()
+        self._journal.seek(0)
+        self._journal.truncate()
+
+    def close(self):
+        """写入剩余的回答并关闭日志文件。"""
+        self.flush()
+        self._journal.close()
@@ -0,0 +1,263 @@
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# SM2 固定参数
+DEFAULT_EASINESS = 2.5
+MIN_EASINESS = 1.3
+# 可拟合的 SM2 参数及默认值：前两次答对后的间隔、每级评分的易度因子步长、易度因子上限、
+# 判定为已掌握的易度因子阈值。拟合结果按单词库保存在 scheduler_params 表中
+DEFAULT_PARAMS = {
+    "first_interval": 1,
+    "second_interval": 6,
+    "ef_step": 0.1,
+    "max_easiness": 2.8,
+    "mastery_easiness": 2.8,
+}
+# 单词状态，按学习进度排列；模拟器中用下标表示状态
+STATUSES = ['未学习', '学习中', '待巩固', '已掌握']
+MASTERED = STATUSES.index('已掌握')
+
+# 模拟回答评分的分布 {评分: 概率}，背诵窗口只会给出 4（认识/答对）和 2（不认识/答错）
+QUALITY_PRESETS = {
+    "good": {4: 0.85, 2: 0.15},
+    "average": {4: 0.7, 2: 0.3},
+    "poor": {4: 0.5, 2: 0.5},
+}
+
+# 预测天数和默认评分分布，从环境变量读取
+forecast_days = int(os.getenv("FORECAST_DAYS", "90"))
+default_preset = os.getenv("FORECAST_QUALITY", "average")
+# 当前单词库名称，用于读取和保存拟合参数
+deck_name = os.getenv("DECK_NAME", "default")
+
+# 读取模拟需要的 SM2 状态（已掌握的单词不再进入复习队列）
+DECK_STATE_SQL = """
+    SELECT interval, repetitions, easiness_factor, status, due_at
+    FROM words
+    WHERE status != '已掌握'
+"""
+LOAD_PARAMS_SQL = "SELECT params FROM scheduler_params WHERE deck = ?"
+SAVE_PARAMS_SQL = """
+    INSERT OR REPLACE INTO scheduler_params
+        (deck, params, target_retention, predicted_retention, predicted_load, reviews_used, fitted_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def load_params(cursor, deck=None):
+    """读取单词库的 SM2 参数，没有拟合结果时使用 DEFAULT_PARAMS。"""
+    cursor.execute(LOAD_PARAMS_SQL, (deck or deck_name,))
+    row = cursor.fetchone()
+    params = dict(DEFAULT_PARAMS)
+    if row:
+        params.update(json.loads(row[0]))
+    return params
+
+
+def save_params(conn, params, deck=None, target_retention=None, predicted_retention=None,
+                predicted_load=None, reviews_used=None):
+    """保存单词库的 SM2 参数及拟合时的评估结果。"""
+    with conn:
+        conn.execute(SAVE_PARAMS_SQL, (
+            deck or deck_name, json.dumps(params), target_retention, predicted_retention,
+            predicted_load, reviews_used, time.time(),
+        ))
+
+
+def sm2_status(repetitions, easiness_factor, params=None):
+    """根据复习次数和易度因子确定单词状态。"""
+    params = params or DEFAULT_PARAMS
+    if easiness_factor >= params["mastery_easiness"]:
+        return '已掌握'
+    if repetitions >= 3 and easiness_factor >= 2.0:
+        return '待巩固'
+    if repetitions > 0:
+        return '学习中'
+    return '未学习'
+
+
+def sm2_update(quality, interval, repetitions, easiness_factor, params=None):
+    """
+    按 SM2 算法计算一次回答后的状态，params 默认为 DEFAULT_PARAMS。
+    答对（quality >= 3）时间隔依次为 first_interval、second_interval、上次间隔 × 易度因子，
+    答错时从 1 天重新开始；易度因子按 ef_step × (quality - 3) 调整，限制在 [MIN_EASINESS, max_easiness]。
+
+    Returns:
+        tuple: (interval, repetitions, easiness_factor, status)
+    """
+    interval = interval if interval is not None else 0
+    repetitions = repetitions if repetitions is not None else 0
+    easiness_factor = easiness_factor if easiness_factor is not None else DEFAULT_EASINESS
+    params = params or DEFAULT_PARAMS
+
+    if quality >= 3:
+        if repetitions == 0:
+            interval = params["first_interval"]
+        elif repetitions == 1:
+            interval = params["second_interval"]
+        else:
+            interval = int(interval * easiness_factor)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval = 1
+
+    easiness_factor = max(MIN_EASINESS, min(params["max_easiness"], easiness_factor + params["ef_step"] * (quality - 3)))
+    return interval, repetitions, easiness_factor, sm2_status(repetitions, easiness_factor, params)
+
+
+def sm2_update_arrays(quality, interval, repetitions, easiness_factor, params=None):
+    """
+    sm2_update 的 NumPy 向量化版本，一次更新所有单词。
+    参数为等长数组，返回新的 (interval, repetitions, easiness_factor, status 下标) 数组。
+    params 中的值也可以是数组，按广播规则同时计算多组参数（拟合参数时使用）。
+    """
+    import numpy as np
+
+    params = params or DEFAULT_PARAMS
+    correct = quality >= 3
+    grown = np.floor(interval * easiness_factor).astype(np.int64)
+    new_interval = np.where(
+        correct,
+        np.select([repetitions == 0, repetitions == 1], [params["first_interval"], params["second_interval"]], grown),
+        1,
+    )
+    new_repetitions = np.where(correct, repetitions + 1, 0)
+    new_easiness = np.clip(easiness_factor + params["ef_step"] * (quality - 3), MIN_EASINESS, params["max_easiness"])
+    status = np.select(
+        [new_easiness >= params["mastery_easiness"], (new_repetitions >= 3) & (new_easiness >= 2.0), new_repetitions > 0],
+        [MASTERED, STATUSES.index('待巩固'), STATUSES.index('学习中')],
+        STATUSES.index('未学习'),
+    )
+    return new_interval, new_repetitions, new_easiness, status
+
+
+def load_deck(cursor, now=None):
+    """
+    读取所有未掌握单词的 SM2 状态，返回数组字典：
+    interval、repetitions、easiness_factor、status（下标）和 due_day（距今天的到期天数，已到期为 0）。
+    """
+    import numpy as np
+
+    now = time.time() if now is None else now
+    rows = cursor.execute(DECK_STATE_SQL).fetchall()
+    interval, repetitions, easiness, status, due_at = zip(*rows) if rows else ((),) * 5
+    status_index = {name: i for i, name in enumerate(STATUSES)}
+    return {
+        "interval": np.array([v or 0 for v in interval], dtype=np.int64),
+        "repetitions": np.array([v or 0 for v in repetitions], dtype=np.int64),
+        "easiness_factor": np.array([DEFAULT_EASINESS if v is None else v for v in easiness], dtype=np.float64),
+        "status": np.array([status_index.get(v, 0) for v in status], dtype=np.int64),
+        "due_day": np.maximum(np.floor((np.array(due_at, dtype=np.float64) - now) / 86400), 0).astype(np.int64),
+    }
+
+
+def simulate(deck, days=None, quality=None, daily_limit=None, seed=None, params=None):
+    """
+    模拟未来 days 天每天的复习量，所有单词在每一天同时向量化更新，不对单词逐个循环。
+
+    Args:
+        deck (dict): load_deck 返回的数组字典，不会被修改。
+        days (int, optional): 模拟天数，默认 FORECAST_DAYS。
+        quality (dict or str, optional): 评分分布 {评分: 概率} 或 QUALITY_PRESETS 中的名称。
+        daily_limit (int, optional): 每天最多复习的单词数，超出的单词按到期先后顺延到第二天。
+        seed (int, optional): 随机数种子。
+        params (dict, optional): SM2 参数，默认为 DEFAULT_PARAMS。
+
+    Returns:
+        dict: 每天的 reviews（复习次数）、correct（答对次数）、mastered（新掌握单词数）、
+        backlog（当天复习后仍到期未复习的单词数）数组，以及模拟结束时剩余未掌握的单词数 remaining。
+    """
+    import numpy as np
+
+    days = days or forecast_days
+    quality = quality or default_preset
+    if isinstance(quality, str):
+        quality = QUALITY_PRESETS[quality]
+    qualities = np.array(list(quality.keys()), dtype=np.int64)
+    probabilities = np.array(list(quality.values()), dtype=np.float64)
+    probabilities /= probabilities.sum()
+    rng = np.random.default_rng(seed)
+
+    interval = deck["interval"].copy()
+    repetitions = deck["repetitions"].copy()
+    easiness = deck["easiness_factor"].copy()
+    status = deck["status"].copy()
+    due_day = deck["due_day"].copy()
+    active = status != MASTERED
+
+    result = {name: np.zeros(days, dtype=np.int64) for name in ("reviews", "correct", "mastered", "backlog")}
+    for day in range(days):
+        due = np.flatnonzero(active & (due_day <= day))
+        if daily_limit is not None and len(due) > daily_limit:
+            due = due[np.argsort(due_day[due], kind="stable")[:daily_limit]]
+        answers = rng.choice(qualities, size=len(due), p=probabilities)
+        new_interval, new_repetitions, new_easiness, new_status = sm2_update_arrays(
+            answers, interval[due], repetitions[due], easiness[due], params
+        )
+        interval[due] = new_interval
+        repetitions[due] = new_repetitions
+        easiness[due] = new_easiness
+        status[due] = new_status
+        due_day[due] = day + new_interval
+        newly_mastered = new_status == MASTERED
+        active[due[newly_mastered]] = False
+
+        result["reviews"][day] = len(due)
+        result["correct"][day] = np.count_nonzero(answers >= 3)
+        result["mastered"][day] = np.count_nonzero(newly_mastered)
+        result["backlog"][day] = np.count_nonzero(active & (due_day <= day))
+    result["remaining"] = int(np.count_nonzero(active))
+    return result
+
+
+def forecast(cursor, days=None, quality=None, daily_limit=None, seed=None):
+    """读取当前单词库及其 SM2 参数，模拟未来 days 天每天的复习量，参数同 simulate。"""
+    return simulate(load_deck(cursor), days=days, quality=quality, daily_limit=daily_limit, seed=seed,
+                    params=load_params(cursor))
+
+
+def synthetic_deck(size, seed=None):
+    """生成 size 个随机状态的单词，用于基准测试。"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    repetitions = rng.integers(0, 6, size)
+    return {
+        "interval": np.where(repetitions == 0, 0, rng.integers(1, 60, size)),
+        "repetitions": repetitions,
+        "easiness_factor": rng.uniform(MIN_EASINESS, DEFAULT_PARAMS["max_easiness"] - 0.1, size),
+        "status": np.where(repetitions == 0, 0, 1),
+        "due_day": rng.integers(0, 30, size),
+    }
+
+
+if __name__ == "__main__":
+    # 命令行用法：
+    #   python scheduler.py bench [单词数]   对随机单词库做基准测试
+    #   python scheduler.py [评分分布名称]     预测当前单词库未来 FORECAST_DAYS 天的复习量
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+        deck = synthetic_deck(size, seed=0)
+        for preset in QUALITY_PRESETS:
+            start = time.perf_counter()
+            result = simulate(deck, quality=preset, seed=0)
+            elapsed = time.perf_counter() - start
+            print(f"{preset}: {size} 个单词 × {len(result['reviews'])} 天，耗时 {elapsed:.3f} 秒，"
+                  f"共复习 {result['reviews'].sum()} 次，剩余未掌握 {result['remaining']} 个")
+    else:
+        from database import init_database, close_all_connections
+
+        conn, cursor = init_database()
+        result = forecast(cursor, quality=sys.argv[1] if len(sys.argv) > 1 else None)
+        close_all_connections()
+        for day, (reviews, correct, mastered) in enumerate(zip(result["reviews"], result["correct"], result["mastered"])):
+            print(f"第 {day + 1} 天: 复习 {reviews} 次，答对 {correct} 次，新掌握 {mastered} 个")
+        print(f"{len(result['reviews'])} 天后剩余未掌握单词: {result['remaining']}")
@@ -0,0 +1,140 @@
+import tkinter as tk
+from tkinter import ttk
+from database import HAS_FTS_SQL
+
+# trigram 分词只能匹配不少于 3 个字符的词
+MIN_MATCH_LENGTH = 3
+
+# 全文检索：按 bm25 排序（words_fts 的 rank 已配置列权重），排序在 FTS5 内部完成
+FTS_SEARCH_SQL = """
+    SELECT w.id, w.word, w.translation, w.example, w.status
+    FROM words_fts
+    JOIN words w ON w.id = words_fts.rowid
+    WHERE words_fts MATCH ?{filters}
+    ORDER BY words_fts.rank
+    LIMIT ?
+"""
+# 查询词都短于 3 个字符时按下面的条件过滤，找到 LIMIT 条后停止
+SHORT_SEARCH_SQL = """
+    SELECT id, word, translation, example, status
+    FROM words w
+    WHERE {filters}
+    LIMIT ?
+"""
+# 一两个字的中文词：在 words_grams 单字/双字索引中查找（翻译或例句中出现）
+GRAM_FILTER = "w.id IN (SELECT word_id FROM words_grams WHERE gram = ?)"
+# 其他短词（如 “AT”）：只匹配单词开头，使用 idx_words_word_nocase
+WORD_PREFIX_FILTER = "w.word LIKE ? ESCAPE '\\'"
+# 没有全文索引时，较长的词只能用 LIKE 扫描单词、翻译和例句
+LIKE_FILTER = "(w.word LIKE ? ESCAPE '\\' OR w.translation LIKE ? ESCAPE '\\' OR w.example LIKE ? ESCAPE '\\')"
+
+# 搜索结果表格的列：(列名, 标题, 宽度)
+RESULT_COLUMNS = [
+    ("id", "ID", 60),
+    ("word", "单词", 150),
+    ("translation", "翻译", 250),
+    ("example", "例句", 300),
+]
+
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _is_cjk(term):
+    """是否全部由汉字组成（CJK 统一汉字及扩展 A 区，与 words_grams 一致）。"""
+    return all("\u3400" <= char <= "\u9fff" for char in term)
+
+
+def build_search_query(query, limit=50, use_fts=True):
+    """
+    把用户输入拆成空格分隔的词，所有词都要出现（在单词、翻译或例句中）。
+    不少于 3 个字符的词用 FTS5 短语匹配并按相关度排序；一两个字的中文词查 words_grams 索引，
+    其他短词只匹配单词开头。没有全文索引时较长的词退化为 LIKE 扫描。
+    返回 (SQL, 参数)；没有有效查询词时返回 None。
+    """
+    terms = query.split()
+    if not terms:
+        return None
+    long_terms = [term for term in terms if len(term) >= MIN_MATCH_LENGTH] if use_fts else []
+
+    params = []
+    filters = []
+    for term in terms:
+        if term in long_terms:
+            continue
+        if len(term) >= MIN_MATCH_LENGTH:
+            filters.append(LIKE_FILTER)
+            params.extend([f"%{_escape_like(term)}%"] * 3)
+        elif _is_cjk(term):
+            filters.append(GRAM_FILTER)
+            params.append(term)
+        else:
+            filters.append(WORD_PREFIX_FILTER)
+            params.append(f"{_escape_like(term)}%")
+    if long_terms:
+        match = " AND ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+        sql = FTS_SEARCH_SQL.format(filters="".join(" AND " + f for f in filters))
+        params.insert(0, match)
+    else:
+        sql = SHORT_SEARCH_SQL.format(filters=" AND ".join(filters))
+    params.append(limit)
+    return sql, params
+
+
+def search_words(cursor, query, limit=50):
+    """
+    在单词、中文翻译和例句中搜索，返回 [(id, word, translation, example, status)]，最相关的在前。
+    数据库没有全文索引时较长的词使用 LIKE 查询。
+    """
+    cursor.execute(HAS_FTS_SQL)
+    built = build_search_query(query, limit, use_fts=cursor.fetchone() is not None)
+    if built is None:
+        return []
+    cursor.execute(*built)
+    return cursor.fetchall()
+
+
+def show_search_window(parent, cursor, on_select=None):
+    """
+    显示搜索窗口：输入关键词后按回车或点击搜索，结果按相关度排列。
+    双击结果时以单词 ID 调用 on_select（例如打开修改窗口）。
+    """
+    win = tk.Toplevel(parent)
+    win.title("搜索单词")
+    win.geometry("800x500")
+
+    input_frame = ttk.Frame(win)
+    input_frame.pack(fill=tk.X, padx=5, pady=5)
+    ttk.Label(input_frame, text="关键词（单词、翻译或例句）：").pack(side=tk.LEFT)
+    query_entry = ttk.Entry(input_frame, width=40)
+    query_entry.pack(side=tk.LEFT, padx=5)
+    result_label = ttk.Label(win, text="")
+
+    tree = ttk.Treeview(win, columns=[col[0] for col in RESULT_COLUMNS], show="headings")
+    for key, heading, width in RESULT_COLUMNS:
+        tree.heading(key, text=heading)
+        tree.column(key, width=width, anchor=tk.W)
+
+    def run_search(event=None):
+        query = query_entry.get().strip()
+        tree.delete(*tree.get_children())
+        if not query:
+            result_label.config(text="请输入关键词！")
+            return
+        rows = search_words(cursor, query)
+        for row in rows:
+            tree.insert("", tk.END, values=[value or "" for value in row[:4]])
+        result_label.config(text=f"找到 {len(rows)} 个结果" if rows else "没有找到匹配的单词")
+
+    def on_double_click(event):
+        selected = tree.focus()
+        if selected and on_select:
+            on_select(int(tree.item(selected, "values")[0]))
+
+    ttk.Button(input_frame, text="搜索", command=run_search).pack(side=tk.LEFT)
+    result_label.pack(anchor=tk.W, padx=5)
+    tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    query_entry.bind("<Return>", run_search)
+    tree.bind("<Double-1>", on_double_click)
+    query_entry.focus()
@@ -0,0 +1,109 @@
+import datetime
+import os
+import tkinter as tk
+from tkinter import ttk, messagebox
+from dotenv import load_dotenv
+
+# 加载 .env 文件中的环境变量
+load_dotenv()
+
+# 统计窗口默认显示的天数
+stats_days = int(os.getenv("STATS_DAYS", "30"))
+
+# 读取每日汇总（review_daily 按天增量维护，行数等于学习天数，不扫描 reviews 日志）
+DAILY_STATS_SQL = """
+    SELECT day, reviews, correct, lapses, quality_sum, latency_ms_sum, mastered
+    FROM review_daily
+    WHERE day >= ?
+    ORDER BY day
+"""
+
+# 统计表格的列：(列名, 标题, 宽度, 格式化函数)
+STATS_COLUMNS = [
+    ("day", "日期", 100, str),
+    ("reviews", "复习次数", 80, str),
+    ("accuracy", "正确率", 80, lambda value: f"{value:.0%}"),
+    ("accuracy_7d", "7日正确率", 80, lambda value: f"{value:.0%}"),
+    ("lapses", "遗忘", 60, str),
+    ("mastered", "新掌握", 60, str),
+    ("avg_quality", "平均评分", 80, lambda value: f"{value:.2f}"),
+    ("avg_latency_s", "平均用时(秒)", 90, lambda value: f"{value:.1f}"),
+]
+
+
+def load_daily_stats(conn, days=None):
+    """
+    读取最近 days 天的每日复习统计，返回按日期排列的 pandas DataFrame。
+    没有复习的日期补零；正确率、平均评分、平均用时由汇总列计算，7 日正确率按复习次数加权。
+    """
+    import pandas as pd
+
+    days = days or stats_days
+    start = datetime.date.today() - datetime.timedelta(days=days - 1)
+    df = pd.read_sql_query(DAILY_STATS_SQL, conn, params=(start.isoformat(),), index_col="day")
+    df.index = pd.to_datetime(df.index)
+    df = df.reindex(pd.date_range(start, periods=days, freq="D"), fill_value=0)
+    df.index.name = "day"
+
+    reviews = df["reviews"].where(df["reviews"] > 0)
+    df["accuracy"] = (df["correct"] / reviews).fillna(0.0)
+    df["avg_quality"] = (df["quality_sum"] / reviews).fillna(0.0)
+    df["avg_latency_s"] = (df["latency_ms_sum"] / reviews / 1000).fillna(0.0)
+    rolling = df[["correct", "reviews"]].rolling(7, min_periods=1).sum()
+    df["accuracy_7d"] = (rolling["correct"] / rolling["reviews"].where(rolling["reviews"] > 0)).fillna(0.0)
+    return df
+
+
+def summarize(df):
+    """汇总统计区间内的总复习次数、正确率、遗忘次数、新掌握单词数和学习天数。"""
+    total = int(df["reviews"].sum())
+    return {
+        "reviews": total,
+        "accuracy": float(df["correct"].sum() / total) if total else 0.0,
+        "lapses": int(df["lapses"].sum()),
+        "mastered": int(df["mastered"].sum()),
+        "active_days": int((df["reviews"] > 0).sum()),
+    }
+
+
+def show_stats_window(parent, conn, days=None):
+    """显示最近 days 天的复习统计窗口，最新的日期在最上方。"""
+    try:
+        df = load_daily_stats(conn, days)
+    except ImportError:
+        messagebox.showerror("错误", "学习统计需要安装 pandas：pip install pandas")
+        return
+
+    win = tk.Toplevel(parent)
+    win.title("学习统计")
+    win.geometry("700x500")
+
+    summary = summarize(df)
+    ttk.Label(win, text=(
+        f"最近 {len(df)} 天：复习 {summary['reviews']} 次，正确率 {summary['accuracy']:.0%}，"
+        f"遗忘 {summary['lapses']} 次，新掌握 {summary['mastered']} 个单词，学习 {summary['active_days']} 天"
+    )).pack(pady=5)
+
+    tree = ttk.Treeview(win, columns=[col[0] for col in STATS_COLUMNS], show="headings")
+    for key, heading, width, _ in STATS_COLUMNS:
+        tree.heading(key, text=heading)
+        tree.column(key, width=width, anchor=tk.W)
+    tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    table = df.reset_index()
+    table["day"] = table["day"].dt.strftime("%Y-%m-%d")
+    for row in table.iloc[::-1].itertuples(index=False):
+        row = row._asdict()
+        tree.insert("", tk.END, values=[fmt(row[key]) for key, _, _, fmt in STATS_COLUMNS])
+
+
+if __name__ == "__main__":
+    # 命令行用法：python stats.py [天数]
+    import sys
+    from database import init_database, close_all_connections
+
+    conn, cursor = init_database()
+    df = load_daily_stats(conn, int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    close_all_connections()
+    print(df[[col[0] for col in STATS_COLUMNS[1:]]].to_string())
+    print(summarize(df))
@@ -0,0 +1,283 @@
+import bisect
+import threading
+from collections import Counter, defaultdict
+
+# 读取全部单词以建立索引
+ALL_WORDS_SQL = "SELECT word FROM words"
+
+# 三元组长度；每次编辑最多破坏 GRAM_SIZE 个三元组
+GRAM_SIZE = 3
+# 计数过滤时最多合并的倒排表长度之和，超出后跳过其余较常见的三元组
+POSTING_BUDGET = 2000
+# 一次加入的单词超过这个数量时整体重新排序，否则逐个插入有序表
+BULK_SORT_SIZE = 64
+
+
+def default_distance(word):
+    """按单词长度决定允许的编辑距离：3 个字母以内不纠错，一般单词容忍 1 处拼写错误，9 个字母以上容忍 2 处。"""
+    if len(word) <= 3:
+        return 0
+    return 1 if len(word) <= 8 else 2
+
+
+def grams(word):
+    """返回单词（首尾补位后）的三元组列表，可包含重复项；长度为 n 的单词有 n + 1 个三元组。"""
+    padded = "$$" + word + "$"
+    return [padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)]
+
+
+def bounded_levenshtein(a, b, limit):
+    """
+    计算 a、b 的编辑距离，只在 limit 以内精确计算：超过 limit 时提前返回 limit + 1。
+    每行只计算对角线附近 limit 宽的带状区域。
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    too_far = limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [too_far] * (len(b) + 1)
+        if low == 1:
+            current[0] = i
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return too_far
+        previous = current
+    return min(previous[len(b)], too_far)
+
+
+def grade_answer(answer, expected):
+    """
+    背诵模式 2 的评分：完全正确为 4；长度超过 3 的单词只差 1 处拼写错误为 3（部分得分）；否则为 2。
+    返回 (评分, 编辑距离)。
+    """
+    answer, expected = answer.strip().lower(), expected.strip().lower()
+    distance = bounded_levenshtein(answer, expected, 1)
+    if distance == 0:
+        return 4, 0
+    if distance == 1 and len(expected) > 3:
+        return 3, 1
+    return 2, distance
+
+
+class VocabIndex:
+    """
+    单词库的内存相似度索引：三元组倒排表加长度过滤，用于拼写纠错和模糊查找。
+    编辑距离不超过 d 时，d 次编辑最多破坏 3d 个三元组，因此在查询单词的任意 m 个三元组中，
+    匹配单词至少包含 m - 3d 个；只对最稀有的三元组计数，再用带状编辑距离验证通过计数的少数单词。
+    另有按小写单词排序的列表，用于输入时的前缀补全。
+    同一实例可被多个线程共享。
+    """
+
+    def __init__(self, words=()):
+        self._lock = threading.Lock()
+        self._words = []  # 原始拼写
+        self._ids = {}  # 小写单词 -> 下标
+        self._postings = defaultdict(list)  # 三元组 -> 单词下标列表
+        self._sorted = []  # 排序后的小写单词
+        self.add_words(words)
+
+    def __len__(self):
+        return len(self._words)
+
+    def add_words(self, words):
+        """把单词加入索引，已存在的单词（忽略大小写）跳过。"""
+        with self._lock:
+            added = []
+            for word in words:
+                key = word.lower()
+                if not key or key in self._ids:
+                    continue
+                word_id = len(self._words)
+                self._words.append(word)
+                self._ids[key] = word_id
+                for gram in set(grams(key)):
+                    self._postings[gram].append(word_id)
+                added.append(key)
+            if len(added) > BULK_SORT_SIZE:
+                self._sorted.extend(added)
+                self._sorted.sort()
+            else:
+                for key in added:
+                    bisect.insort(self._sorted, key)
+
+    def __contains__(self, word):
+        return word.lower() in self._ids
+
+    def complete(self, prefix, limit=10):
+        """返回以 prefix 开头（忽略大小写）的单词，按字母顺序排列，最多 limit 个。"""
+        key = prefix.strip().lower()
+        if not key:
+            return []
+        with self._lock:
+            keys = self._sorted
+            i = bisect.bisect_left(keys, key)
+            matches = []
+            while i < len(keys) and len(matches) < limit and keys[i].startswith(key):
+                matches.append(self._words[self._ids[keys[i]]])
+                i += 1
+        return matches
+
+    def search(self, query, max_distance=None, limit=5):
+        """
+        查找与 query 编辑距离不超过 max_distance（默认按长度决定）的单词。
+        返回按 (编辑距离, 单词) 排序的 [(编辑距离, 单词)]，最多 limit 个。
+        """
+        key = query.strip().lower()
+        if not key:
+            return []
+        max_distance = default_distance(key) if max_distance is None else max_distance
+        with self._lock:
+            if key in self._ids:
+                exact = self._words[self._ids[key]]
+                if max_distance == 0:
+                    return [(0, exact)]
+            if max_distance == 0:
+                return []
+            query_grams = sorted(set(grams(key)), key=lambda gram: len(self._postings.get(gram, ())))
+            needed = GRAM_SIZE * max_distance + 1
+            if len(query_grams) < needed:
+                # 单词太短，三元组过滤不成立，退化为验证所有单词
+                candidates = range(len(self._words))
+            else:
+                # 计数过滤：取最稀有的 m 个三元组（m >= 3d + 1，常见三元组超出预算时不再加入），
+                # 匹配单词至少包含其中 m - 3d 个
+                counts = Counter()
+                used = 0
+                postings = 0
+                for gram in query_grams:
+                    posting = self._postings.get(gram, ())
+                    if used >= needed and postings + len(posting) > POSTING_BUDGET:
+                        break
+                    counts.update(posting)
+                    postings += len(posting)
+                    used += 1
+                threshold = used - GRAM_SIZE * max_distance
+                candidates = [word_id for word_id, count in counts.items() if count >= threshold]
+            words = self._words
+            matches = []
+            for word_id in candidates:
+                word = words[word_id]
+                if abs(len(word) - len(key)) > max_distance:
+                    continue
+                distance = bounded_levenshtein(key, word.lower(), max_distance)
+                if distance <= max_distance:
+                    matches.append((distance, word))
+        matches.sort()
+        return matches[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()  # 只保护 _index 和 _pending 的读写，持有时间很短
+_build_lock = threading.Lock()  # 同一时间只有一个线程建立索引
+_pending = None  # 建立索引期间新入库的单词，建立完成后补入
+
+
+def get_index(cursor):
+    """
+    返回全局单词索引，第一次调用时从数据库建立。
+    建立过程不持有 _index_lock，建好后一次赋值发布，界面线程的 complete_word 不会因此等待。
+    """
+    global _index, _pending
+    with _index_lock:
+        if _index is not None:
+            return _index
+    with _build_lock:
+        with _index_lock:
+            if _index is not None:
+                return _index
+            _pending = []
+        try:
+            index = VocabIndex(row[0] for row in cursor.execute(ALL_WORDS_SQL))
+            with _index_lock:
+                index.add_words(_pending)
+                _index = index
+        finally:
+            with _index_lock:
+                _pending = None
+        return index
+
+
+def reset_index():
+    """丢弃全局索引，下次 get_index 时重新建立（切换数据库后使用）。"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def complete_word(prefix, limit=10):
+    """
+    用全局索引补全单词前缀；索引尚未建立时返回空列表而不等待，
+    供界面线程在每次按键时调用。
+    """
+    with _index_lock:
+        index = _index
+    return index.complete(prefix, limit) if index is not None else []
+
+
+def add_to_index(words):
+    """
+    把新入库的单词加入全局索引。索引正在建立时先记下，建好后补入；
+    尚未开始建立时跳过（建立时会从数据库读取这些单词）。
+    """
+    with _index_lock:
+        index = _index
+        if index is None:
+            if _pending is not None:
+                _pending.extend(words)
+            return
+    index.add_words(words)
+
+
+if __name__ == "__main__":
+    # 命令行用法：python vocab_index.py bench [单词数]，用随机单词测试建立和查询耗时
+    import random
+    import string
+    import sys
+    import time
+
+    size = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[1] == "bench" else 100_000
+    rng = random.Random(0)
+    words = list({
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 14)))
+        for _ in range(size)
+    })
+    start = time.perf_counter()
+    index = VocabIndex(words)
+    print(f"建立索引: {len(index)} 个单词，耗时 {time.perf_counter() - start:.2f} 秒")
+
+    queries = []
+    for word in rng.sample(words, 1000):
+        chars = list(word)
+        position = rng.randrange(len(chars))
+        chars[position] = rng.choice(string.ascii_lowercase)  # 替换一个字母
+        queries.append("".join(chars))
+    start = time.perf_counter()
+    found = sum(1 for query in queries if index.search(query))
+    elapsed = time.perf_counter() - start
+    print(f"模糊查询: {len(queries)} 次，命中 {found} 次，平均 {elapsed / len(queries) * 1000:.3f} 毫秒/次")
+
+    prefixes = [word[:rng.randint(1, 4)] for word in rng.sample(words, 1000)]
+    start = time.perf_counter()
+    for prefix in prefixes:
+        index.complete(prefix)
+    elapsed = time.perf_counter() - start
+    print(f"前缀补全: {len(prefixes)} 次，平均 {elapsed / len(prefixes) * 1000:.3f} 毫秒/次")
+
+    start = time.perf_counter()
+    for word in rng.sample(words, 1000):
+        index.add_words([word + "x"])
+    elapsed = time.perf_counter() - start
+    print(f"逐个加入单词: 1000 次，平均 {elapsed / 1000 * 1000:.3f} 毫秒/次")
@@ -1,14 +1,56 @@
+import time
 import tkinter as tk
+from importer import import_words
+from vocab_index import get_index, add_to_index
+from glossary import get_glossary
+from scheduler import load_params, DEFAULT_EASINESS
 
-def query_word(word, conn, cursor):
+# 单词表上的常用查询，query_plan.py 会检查它们的执行计划
+WORD_LOOKUP_SQL = "SELECT * FROM words WHERE word = ? COLLATE NOCASE LIMIT 1"
+WORD_BY_ID_SQL = "SELECT * FROM words WHERE id = ?"
+INSERT_WORD_SQL = """
+    INSERT INTO words (word, translation, phonetic, example, status)
+    VALUES (?, ?, ?, ?, '未学习')
+"""
+SET_STATUS_SQL = "UPDATE words SET status = ? WHERE id = ?"
+SET_STATUS_AND_EF_SQL = "UPDATE words SET status = ?, easiness_factor = ? WHERE id = ?"
+# 已掌握的单词改为其他状态：像答错一样从头复习，立即到期，易度因子降到掌握阈值以下
+UNMASTER_SQL = """
+    UPDATE words
+    SET status = ?, interval = 0, repetitions = 0, due_at = ?, easiness_factor = MIN(easiness_factor, ?)
+    WHERE id = ? AND status = '已掌握'
+"""
+LIST_WORDS_SQL = "SELECT id, word, translation, status FROM words"
+LIST_MASTERY_SQL = "SELECT id, word, translation, status, repetitions, easiness_factor FROM words"
+
+def _print_word(row):
+    print(f"\n单词: {row[1]}")
+    print(f"翻译: {row[2]}")
+    print(f"音标: {row[3]}")
+    print(f"例句: {row[4]}")
+    print(f"状态: {row[5]}")
+
+def _save_new_word(word, word_info, conn, cursor):
+    cursor.execute(INSERT_WORD_SQL, (word, word_info['translation'], word_info['phonetic'], word_info['example']))
+    conn.commit()
+    add_to_index([word])
+    print(f"单词 '{word}' 已成功添加到数据库。")
+    print(f"翻译: {word_info['translation']}")
+    print(f"音标: {word_info['phonetic']}")
+    print(f"例句: {word_info['example']}")
+    print("状态: 未学习")
+
+def query_word(word, conn, cursor, suggest=True):
     """
-    查询单词，支持从数据库读取或在线查询并保存。
+    查询单词，依次从数据库（忽略大小写）、本地词汇表（glossary.py）读取，都没有时在线查询并保存。
+    数据库中没有该单词但有拼写相近的单词时，先提示“你是不是要找”并显示最接近的单词，不发起在线查询。
     返回单词信息，或在查询失败时返回 None。
     
     Args:
         word (str): 要查询的单词。
         conn (sqlite3.Connection): 数据库连接对象。
         cursor (sqlite3.Cursor): 数据库游标对象。
+        suggest (bool): 是否先查找拼写相近的单词，为 False 时直接在线查询。
     
     Returns:
         dict or None: 包含单词信息的字典（translation, phonetic, example），查询失败返回 None。
@@ -16,34 +58,78 @@ def query_word(word, conn, cursor):
     Raises:
         sqlite3.Error: 数据库操作失败时抛出。
     """
-    cursor.execute("SELECT * FROM words WHERE word = ?", (word,))
+    cursor.execute(WORD_LOOKUP_SQL, (word,))
     result = cursor.fetchone()
     if result:
-        print(f"\n单词: {result[1]}")
-        print(f"翻译: {result[2]}")
-        print(f"音标: {result[3]}")
-        print(f"例句: {result[4]}")
-        print(f"状态: {result[5]}")
+        _print_word(result)
+        return result
+    word_info = get_glossary().lookup(word)
+    if word_info:
+        print(f"单词 '{word}' 未在数据库中找到，已从本地词汇表查到。")
+        _save_new_word(word, word_info, conn, cursor)
+        return word_info
+    matches = get_index(cursor).search(word) if suggest else []
+    if matches:
+        print(f"单词 '{word}' 未在数据库中找到，你是不是要找：{'、'.join(match for _, match in matches)}")
+        cursor.execute(WORD_LOOKUP_SQL, (matches[0][1],))
+        result = cursor.fetchone()
+        if result:
+            _print_word(result)
+        print(f"如需在线查询 '{word}'，请勾选“直接在线查询”后重新查询。")
         return result
     else:
         from api import fetch_word_info
         print(f"单词 '{word}' 未在数据库中找到，正在查询在线信息...")
         word_info = fetch_word_info(word)
         if word_info:
-            cursor.execute("""
-                INSERT INTO words (word, translation, phonetic, example, status)
-                VALUES (?, ?, ?, ?, '未学习')
-            """, (word, word_info['translation'], word_info['phonetic'], word_info['example']))
-            conn.commit()
-            print(f"单词 '{word}' 已成功添加到数据库。")
-            print(f"翻译: {word_info['translation']}")
-            print(f"音标: {word_info['phonetic']}")
-            print(f"例句: {word_info['example']}")
-            print("状态: 未学习")
+            _save_new_word(word, word_info, conn, cursor)
             return word_info
         else:
             return None
 
+# 支持服务端排序的列，均有对应索引（主键 id 除外）
+SORT_COLUMNS = ('id', 'status', 'repetitions', 'easiness_factor')
+
+def build_page_query(columns, sort_by='id', descending=False, after=None, limit=50):
+    """
+    生成键集分页查询，返回 (SQL, 参数)。参数含义见 fetch_words_page。
+    """
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"不支持的排序列: {sort_by}")
+    order = "DESC" if descending else "ASC"
+    order_by = "id" if sort_by == "id" else f"{sort_by} {order}, id"
+    sql = f"SELECT {', '.join(columns)} FROM words"
+    params = []
+    if after is not None:
+        op = "<" if descending else ">"
+        if sort_by == "id":
+            sql += f" WHERE id {op} ?"
+            params.append(after[1])
+        else:
+            sql += f" WHERE ({sort_by}, id) {op} (?, ?)"
+            params.extend(after)
+    sql += f" ORDER BY {order_by} {order} LIMIT ?"
+    params.append(limit)
+    return sql, params
+
+def fetch_words_page(cursor, columns, sort_by='id', descending=False, after=None, limit=50):
+    """
+    按键集分页读取单词，只取一页数据，翻页开销与所在页码和表大小无关。
+
+    Args:
+        cursor (sqlite3.Cursor): 数据库游标对象。
+        columns (list[str]): 要读取的列，必须包含 id 和排序列。
+        sort_by (str): 排序列，取值见 SORT_COLUMNS。
+        descending (bool): 是否降序。
+        after (tuple, optional): 上一页最后一行的 (排序列值, id)，为空时读取第一页。
+        limit (int): 每页行数。
+
+    Returns:
+        list[tuple]: 当前页的行。
+    """
+    cursor.execute(*build_page_query(columns, sort_by, descending, after, limit))
+    return cursor.fetchall()
+
 def view_words(cursor):
     """
     查看数据库中的所有单词列表。
@@ -52,13 +138,15 @@ def view_words(cursor):
         cursor (sqlite3.Cursor): 数据库游标对象。
     """
     print("\n=== 单词列表 ===")
-    cursor.execute("SELECT * FROM words")
-    words = cursor.fetchall()
+    cursor.execute(LIST_WORDS_SQL)
+    words = cursor.fetchmany(1000)
     if not words:
         print("数据库中没有单词！")
         return
-    for word in words:
-        print(f"ID: {word[0]}, 单词: {word[1]}, 翻译: {word[2]}, 状态: {word[5]}")
+    while words:
+        for word in words:
+            print(f"ID: {word[0]}, 单词: {word[1]}, 翻译: {word[2]}, 状态: {word[3]}")
+        words = cursor.fetchmany(1000)
 
 def view_mastery_level(cursor, output_text=None):
     """
@@ -74,8 +162,8 @@ def view_mastery_level(cursor, output_text=None):
     else:
         print(msg)
         
-    cursor.execute("SELECT id, word, translation, status, repetitions, easiness_factor FROM words")
-    words = cursor.fetchall()
+    cursor.execute(LIST_MASTERY_SQL)
+    words = cursor.fetchmany(1000)
     if not words:
         msg = "数据库中没有单词！"
         if output_text:
@@ -84,15 +172,34 @@ def view_mastery_level(cursor, output_text=None):
             print(msg)
         return
     
-    for word in words:
-        msg = (
-            f"ID: {word[0]}, 单词: {word[1]}, 翻译: {word[2]}, "
-            f"状态: {word[3]}, 复习次数: {word[4]}, 易度因子: {word[5]:.2f}\n"
-        )
-        if output_text:
-            output_text.insert(tk.END, msg)
-        else:
-            print(msg)
+    while words:
+        for word in words:
+            msg = (
+                f"ID: {word[0]}, 单词: {word[1]}, 翻译: {word[2]}, "
+                f"状态: {word[3]}, 复习次数: {word[4]}, 易度因子: {word[5]:.2f}\n"
+            )
+            if output_text:
+                output_text.insert(tk.END, msg)
+            else:
+                print(msg)
+        words = cursor.fetchmany(1000)
+
+def set_word_status(conn, cursor, word_id, status):
+    """
+    设置单词状态。标记为已掌握时，易度因子设为单词库 SM2 参数（scheduler.load_params）中的
+    mastery_easiness，与背诵时判定已掌握的标准一致。
+    已掌握的单词改为其他状态时，复习次数和间隔清零并立即到期，易度因子降到掌握阈值以下，
+    否则单词要等到原来的到期时间才会回到复习队列，且下一次答对就会重新判定为已掌握。
+    """
+    params = load_params(cursor)
+    if status == '已掌握':
+        cursor.execute(SET_STATUS_AND_EF_SQL, (status, params["mastery_easiness"], word_id))
+    else:
+        easiness = min(DEFAULT_EASINESS, params["mastery_easiness"] - params["ef_step"])
+        cursor.execute(UNMASTER_SQL, (status, time.time(), easiness, word_id))
+        if cursor.rowcount == 0:
+            cursor.execute(SET_STATUS_SQL, (status, word_id))
+    conn.commit()
 
 def mark_word_status(conn, cursor):
     """
@@ -109,7 +216,7 @@ def mark_word_status(conn, cursor):
         return
     try:
         word_id = int(word_id)
-        cursor.execute("SELECT * FROM words WHERE id = ?", (word_id,))
+        cursor.execute(WORD_BY_ID_SQL, (word_id,))
         word = cursor.fetchone()
         if not word:
             print("无效的 ID！")
@@ -118,13 +225,8 @@ def mark_word_status(conn, cursor):
         status = input("设置状态为 (1: 未学习, 2: 学习中, 3: 待巩固, 4: 已掌握): ")
         status_map = {'1': '未学习', '2': '学习中', '3': '待巩固', '4': '已掌握'}
         if status in status_map:
-            if status == '4':  # 已掌握
-                cursor.execute("UPDATE words SET status = ?, easiness_factor = ? WHERE id = ?", 
-                              (status_map[status], 2.8, word_id))
-            else:
-                cursor.execute("UPDATE words SET status = ? WHERE id = ?", (status_map[status], word_id))
+            set_word_status(conn, cursor, word_id, status_map[status])
             print(f"单词 '{word[1]}' 已标记为 '{status_map[status]}'。")
-            conn.commit()
         else:
             print("无效选择！")
     except ValueError:
@@ -153,18 +255,6 @@ def batch_add_words(conn, cursor):
         return
     
     print(f"输入了 {len(words)} 个单词，正在查询并添加到数据库...")
-    for word in words:
-        cursor.execute("SELECT word FROM words WHERE word = ?", (word,))
-        if cursor.fetchone():
-            print(f"单词 '{word}' 已存在，跳过添加。")
-            continue
-        
-        word_info = query_word(word, conn, cursor)
-        if word_info:
-            print(f"单词 '{word}' 已成功添加到数据库。")
-        else:
-            print(f"查询单词 '{word}' 失败，仅保存单词到数据库。")
-            cursor.execute("INSERT INTO words (word, status) VALUES (?, '未学习')", (word,))
-            conn.commit()
+    import_words(conn, cursor, words)
 
     print("批量添加完成！")
\ No newline at end of file
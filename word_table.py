@@ -0,0 +1,114 @@
+import tkinter as tk
+from tkinter import ttk
+from word_manager import fetch_words_page, SORT_COLUMNS
+
+# 单词列表视图的列：(数据库列, 标题, 宽度, 格式化函数)
+WORD_LIST_COLUMNS = [
+    ("id", "ID", 60, str),
+    ("word", "单词", 200, str),
+    ("translation", "翻译", 300, lambda value: value or ""),
+    ("status", "状态", 80, str),
+]
+
+# 掌握程度视图的列
+MASTERY_COLUMNS = WORD_LIST_COLUMNS + [
+    ("repetitions", "复习次数", 80, str),
+    ("easiness_factor", "易度因子", 80, lambda value: f"{value:.2f}"),
+]
+
+
+class WordTableView:
+    """
+    分页显示单词的表格窗口（ttk.Treeview）。
+    每页只读取可见的行数，翻页使用键集分页查询；点击 ID、状态、复习次数、易度因子列标题
+    在数据库端排序，再次点击切换升序/降序。
+    """
+
+    def __init__(self, parent, cursor, columns, title, page_size=25):
+        self.cursor = cursor
+        self.columns = columns
+        self.page_size = page_size
+        self.sort_by = "id"
+        self.descending = False
+        # 每一页起始位置的键（上一页最后一行的 (排序列值, id)），用于向前翻页
+        self.page_keys = [None]
+        self.last_key = None
+
+        self.win = tk.Toplevel(parent)
+        self.win.title(title)
+        self.win.geometry("800x600")
+
+        table_frame = ttk.Frame(self.win)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.tree = ttk.Treeview(table_frame, columns=[col[0] for col in columns], show="headings", height=page_size)
+        for key, heading, width, _ in columns:
+            if key in SORT_COLUMNS:
+                self.tree.heading(key, text=heading, command=lambda k=key: self.sort(k))
+            else:
+                self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.prev_page())
+        self.tree.bind("<Button-5>", lambda event: self.next_page())
+
+        nav_frame = ttk.Frame(self.win)
+        nav_frame.pack(pady=5)
+        self.prev_button = ttk.Button(nav_frame, text="上一页", command=self.prev_page)
+        self.prev_button.pack(side=tk.LEFT, padx=5)
+        self.page_label = ttk.Label(nav_frame, text="")
+        self.page_label.pack(side=tk.LEFT, padx=5)
+        self.next_button = ttk.Button(nav_frame, text="下一页", command=self.next_page)
+        self.next_button.pack(side=tk.LEFT, padx=5)
+
+        self.load_page()
+
+    def load_page(self):
+        """读取并显示当前页，多取一行用于判断是否还有下一页。"""
+        rows = fetch_words_page(
+            self.cursor, [col[0] for col in self.columns], self.sort_by, self.descending,
+            self.page_keys[-1], self.page_size + 1
+        )
+        has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", tk.END, values=[fmt(value) for value, (_, _, _, fmt) in zip(row, self.columns)])
+
+        if not rows and len(self.page_keys) == 1:
+            self.page_label.config(text="数据库中没有单词！")
+        else:
+            self.page_label.config(text=f"第 {len(self.page_keys)} 页")
+        sort_index = [col[0] for col in self.columns].index(self.sort_by)
+        self.last_key = (rows[-1][sort_index], rows[-1][0]) if rows else None
+        self.next_button.config(state=tk.NORMAL if has_next else tk.DISABLED)
+        self.prev_button.config(state=tk.NORMAL if len(self.page_keys) > 1 else tk.DISABLED)
+
+    def next_page(self):
+        if str(self.next_button.cget("state")) == tk.DISABLED or self.last_key is None:
+            return
+        self.page_keys.append(self.last_key)
+        self.load_page()
+
+    def prev_page(self):
+        if len(self.page_keys) <= 1:
+            return
+        self.page_keys.pop()
+        self.load_page()
+
+    def on_mouse_wheel(self, event):
+        if event.delta < 0:
+            self.next_page()
+        else:
+            self.prev_page()
+
+    def sort(self, key):
+        """按指定列排序，重复点击同一列切换升序/降序，并回到第一页。"""
+        if self.sort_by == key:
+            self.descending = not self.descending
+        else:
+            self.sort_by = key
+            self.descending = False
+        self.page_keys = [None]
+        self.load_page()